@@ -0,0 +1,79 @@
+import sys
+import textwrap
+import pytest
+import yaml
+from xia_framework.base import Base
+
+MODULE_PACKAGE = textwrap.dedent("""
+    import os
+    modules = {{"{module_name}": "BenchModule", "{module_name}-extra": "BenchModule"}}
+
+
+    class BenchModule:
+        activate_depends = []
+
+        def initialize(self, **kwargs):
+            pass
+
+        def enable(self, module_dir, **kwargs):
+            os.makedirs(module_dir, exist_ok=True)
+            with open(os.path.join(module_dir, "{module_name}.tf"), "w") as tf_file:
+                tf_file.write('module "{module_name}" {{\\n  source = "./{module_name}"\\n}}\\n')
+
+        activate = enable
+
+        def init_config(self, **kwargs):
+            pass
+""")
+
+
+def build_estate(root_dir, scale: int, env_count: int = 10):
+    """Generate a synthetic estate: module packages, configuration files and environments
+
+    Args:
+        root_dir: estate root directory
+        scale: number of modules, packages and applications
+        env_count: number of environments
+
+    Returns:
+        list of module names
+    """
+    package_dict, module_dict, app_dict = {}, {}, {}
+    for i in range(scale):
+        package_name, module_name = f"xia-bench-{scale}-{i:04d}", f"module-{i:04d}"
+        package_dir = root_dir / package_name.replace("-", "_")
+        package_dir.mkdir()
+        (package_dir / "__init__.py").write_text(MODULE_PACKAGE.format(module_name=module_name))
+        package_dict[package_name] = {"version": "1.0.0"}
+        module_dict[module_name] = {"package": package_name, "events": {"deploy": {"index": i}},
+                                    "depends_on": [f"module-{i - 1:04d}"] if i % 10 else [],
+                                    "activate_scope": [f"app-{j:04d}" for j in range(i % 5)]}
+        app_dict[f"app-{i:04d}"] = {"repository_owner": "x-i-a", "repository_name": f"app-{i:04d}"}
+    config_dir = root_dir / "config"
+    (config_dir / "core").mkdir(parents=True)
+    landscape_lines = ["settings:"] + [f"  # setting_{i:04d}: value" for i in range(scale)]
+    landscape_lines += ["  realm_name: realm", "  foundation_name: foundation", "  module_workers: 4",
+                        "  tf_plugin_cache_dir: ''", "environments:"]
+    landscape_lines += [f"  env{i:02d}:\n    match_branch: refs/heads/main" for i in range(env_count)]
+    (config_dir / "landscape.yaml").write_text("\n".join(landscape_lines) + "\n")
+    (config_dir / "core" / "tfstate.yaml").write_text("tf_bucket: bucket\n")
+    (config_dir / "packages.yaml").write_text(yaml.dump({"repositories": {"default": None},
+                                                         "packages": package_dict}))
+    (config_dir / "modules.yaml").write_text(yaml.dump(module_dict, sort_keys=False))
+    (config_dir / "applications.yaml").write_text(yaml.dump(app_dict, sort_keys=False))
+    base_env_dir = root_dir / "iac" / "environments" / "base"
+    base_env_dir.mkdir(parents=True)
+    for i in range(scale):
+        (base_env_dir / f"file_{i:04d}.tf").write_text(f"# file {i}\n")
+    return list(module_dict)
+
+
+@pytest.fixture
+def synthetic_estate(tmp_path, monkeypatch):
+    """Factory of synthetic estates in a temporary directory, which becomes the current directory"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    Base.config_store.invalidate()
+    yield lambda scale: build_estate(tmp_path, scale)
+    for module_name in [name for name in sys.modules if name.startswith("xia_bench_")]:
+        sys.modules.pop(module_name)
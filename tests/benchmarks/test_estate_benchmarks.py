@@ -0,0 +1,99 @@
+import os
+import json
+import time
+from pathlib import Path
+import pytest
+from xia_framework.base import Base
+from xia_framework.foundation import Foundation
+from xia_framework.tools import Cli, CliGH
+
+# Budgets in seconds of each operation for each scale, multiplied by XIA_BENCH_TOLERANCE (default 3)
+BASELINE = json.loads((Path(__file__).parent / "baseline.json").read_text())
+TOLERANCE = float(os.environ.get("XIA_BENCH_TOLERANCE", "3"))
+SCALES = [10, 100, 1000]
+REPEAT = 3
+
+
+def measure(func, setup=None) -> float:
+    """Best duration of several runs, func and setup receive the run index"""
+    durations = []
+    for i in range(REPEAT):
+        if setup:
+            setup(i)
+        start_time = time.perf_counter()
+        func(i)
+        durations.append(time.perf_counter() - start_time)
+    return min(durations)
+
+
+def check_budget(operation: str, scale: int, duration: float):
+    budget = BASELINE[operation][str(scale)] * TOLERANCE
+    print(f"{operation}[{scale}]: {duration:.4f}s (budget {budget:.4f}s)")
+    assert duration <= budget, f"{operation} at scale {scale} regressed: {duration:.4f}s > {budget:.4f}s"
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("scale", SCALES)
+class TestEstateBenchmarks:
+    def test_load_modules(self, synthetic_estate, scale):
+        synthetic_estate(scale)
+        check_budget("load_modules", scale, measure(lambda i: Base().load_modules()))
+
+    def test_init_module(self, synthetic_estate, scale):
+        module_names = synthetic_estate(scale)
+        base = Base()
+        check_budget("init_module", scale, measure(
+            lambda i: base.init_module(f"xia-bench-{scale}-{i:04d}/{module_names[i]}-extra")
+        ))
+
+    def test_create_app(self, synthetic_estate, scale):
+        module_names = synthetic_estate(scale)
+        foundation = Foundation()
+        check_budget("create_app", scale, measure(
+            lambda i: foundation.create_app(f"new-app-{i}", module_list=module_names[:10])
+        ))
+
+    def test_config_replace(self, synthetic_estate, scale):
+        synthetic_estate(scale)
+        landscape_path = Path("config") / "landscape.yaml"
+        landscape_content = landscape_path.read_text()
+        replace_dict = {f"setting_{i:04d}:": f"  setting_{i:04d}: new-value\n" for i in range(scale)}
+        check_budget("config_replace", scale, measure(
+            lambda i: Base._config_replace(str(landscape_path), replace_dict),
+            setup=lambda i: landscape_path.write_text(landscape_content)
+        ))
+
+    def test_get_needed_packages(self, synthetic_estate, scale):
+        synthetic_estate(scale)
+        base = Base()
+        check_budget("get_needed_packages", scale, measure(lambda i: base.get_needed_packages()))
+
+    def test_prepare(self, synthetic_estate, scale):
+        synthetic_estate(scale)
+        check_budget("prepare", scale, measure(lambda i: Base().prepare(env_name="env00", skip_terraform=True)))
+
+    def test_init_config_replay(self, synthetic_estate, scale, tmp_path):
+        synthetic_estate(scale)
+        gh_variables = [{"name": "COSMOS_NAME", "value": "cosmos"}, {"name": "REALM_NAME", "value": "realm"},
+                        {"name": "FOUNDATION_NAME", "value": "foundation"}, {"name": "TF_BUCKET_NAME", "value": "tf"}]
+        records = [
+            {"cmd": "gh repo view --json owner,name", "stdout": json.dumps({"owner": {"login": "x-i-a"}, "name": "f"}),
+             "stderr": "", "returncode": 0, "duration": 0.5},
+            {"cmd": "gh variable list --json=name,value", "stdout": json.dumps(gh_variables),
+             "stderr": "", "returncode": 0, "duration": 0.5},
+        ]
+        cassette_file = tmp_path / "cassette.json"
+        cassette_file.write_text(json.dumps({"records": records}))
+        Cli.configure("replay", str(cassette_file))
+
+        def clear_gh_cache(i):
+            CliGH._variable_cache.clear()
+            CliGH._repo_cache.clear()
+
+        try:
+            foundation = Foundation()
+            check_budget("init_config_replay", scale, measure(lambda i: foundation.init_config(),
+                                                              setup=clear_gh_cache))
+        finally:
+            clear_gh_cache(0)
+            Cli.configure("real")
@@ -1,3 +1,4 @@
+import os
 import pytest
 import tempfile
 import shutil
@@ -10,4 +11,19 @@ def temp_workspace():
     temp_dir = tempfile.mkdtemp(prefix="xia_test_", dir=".")
     print(Path(temp_dir))
     yield Path(temp_dir)
-    shutil.rmtree(temp_dir)
\ No newline at end of file
+    shutil.rmtree(temp_dir)
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: offline benchmarks on synthetic estates, only run with "
+                                       "'-m benchmark' or XIA_BENCH=1")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Wall-clock benchmarks are opt-in, they are skipped unless selected by a marker expression or XIA_BENCH"""
+    if "benchmark" in (config.getoption("markexpr") or "") or os.environ.get("XIA_BENCH", "") not in ("", "0"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="benchmarks only run with -m benchmark or XIA_BENCH=1")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
@@ -0,0 +1,97 @@
+import os
+import stat
+import pytest
+from xia_framework.application import Application
+
+
+@pytest.fixture
+def fake_terraform(tmp_path, monkeypatch, mocker):
+    """Workspace of two environments with a terraform on PATH which fails to plan sit"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config" / "core").mkdir(parents=True)
+    (tmp_path / "config" / "landscape.yaml").write_text(
+        "settings:\n  realm_name: realm\n  foundation_name: foundation\n  application_name: app\n"
+        "environments:\n  dev:\n  sit:\n"
+    )
+    (tmp_path / "config" / "core" / "tfstate.yaml").write_text("tf_bucket: bucket\n")
+    (tmp_path / "iac" / "modules").mkdir(parents=True)
+    for env_name in ("dev", "sit"):
+        (tmp_path / "iac" / "environments" / env_name).mkdir(parents=True)
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log_file = tmp_path / "terraform.log"
+    terraform = bin_dir / "terraform"
+    terraform.write_text(
+        "#!/bin/sh\n"
+        f'echo "$@" >> {log_file}\n'
+        'case "$*" in *environments/sit*plan*) exit 3;; esac\n'
+    )
+    terraform.chmod(terraform.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    mocker.patch.object(Application, "prepare")
+    mocker.patch.object(Application, "prepare_environments")
+    yield log_file
+
+
+class TestGetEnvNames:
+    def test_env_names(self, fake_terraform):
+        application = Application()
+        assert application.get_env_names("dev") == ["dev"]
+        assert application.get_env_names("dev,sit") == ["dev", "sit"]
+        assert application.get_env_names(all_envs=True) == ["dev", "sit"]
+
+    def test_no_environment(self, fake_terraform):
+        (fake_terraform.parent / "config" / "landscape.yaml").write_text("settings:\n")
+        with pytest.raises(ValueError):
+            Application().get_env_names(all_envs=True)
+
+
+class TestRunEnvironments:
+    def test_results(self, fake_terraform, capsys):
+        env_results = Application().run_environments(["dev", "sit"], "plan")
+        assert env_results == {"dev": 0, "sit": 3}
+        assert "sit: FAILED (exit status 3)" in capsys.readouterr().out
+        log_lines = fake_terraform.read_text().splitlines()
+        assert len([line for line in log_lines if " init " in line]) == 2
+
+    def test_reinit_option(self, fake_terraform):
+        for env_name in ("dev", "sit"):  # Already initialized
+            (fake_terraform.parent / "iac" / "environments" / env_name / ".terraform").mkdir()
+        Application().run_environments(["dev", "sit"], "plan")
+        Application().run_environments(["dev", "sit"], "plan")
+        log_lines = fake_terraform.read_text().splitlines()
+        assert len([line for line in log_lines if " init " in line]) == 2
+        with pytest.raises(SystemExit):  # Plan of sit fails
+            Application().main(["--reinit", "plan", "-e", "dev,sit"])
+        log_lines = fake_terraform.read_text().splitlines()
+        assert len([line for line in log_lines if " init " in line]) == 4
+
+    def test_apply_needs_approval(self, fake_terraform):
+        with pytest.raises(ValueError):
+            Application().run_environments(["dev", "sit"], "apply")
+
+    def test_multi_env_exit_status(self, fake_terraform):
+        with pytest.raises(SystemExit) as e:
+            Application().main(["plan", "-e", "dev,sit"])
+        assert e.value.code == 1
+
+    def test_single_env_consistent(self, fake_terraform):
+        Application().main(["plan", "-e", "dev"])
+        log_lines = fake_terraform.read_text().splitlines()
+        assert log_lines[0].startswith("-chdir=iac/environments/dev init")
+        assert log_lines[1] == "-chdir=iac/environments/dev plan -out=tfplan"
+        with pytest.raises(SystemExit) as e:
+            Application().main(["plan", "-e", "sit"])
+        assert e.value.code == 3
+
+    def test_plan_without_env(self, fake_terraform):
+        Application().main(["plan"])
+        Application.prepare.assert_called_once_with(skip_terraform=True)
+        assert not fake_terraform.exists()
+
+    def test_multi_env_apply_needs_approval(self, fake_terraform, capsys):
+        with pytest.raises(SystemExit) as e:
+            Application().main(["apply", "-e", "dev,sit"])
+        assert e.value.code == 1
+        assert "needs auto approve" in capsys.readouterr().out
+        Application.prepare_environments.assert_not_called()
@@ -0,0 +1,59 @@
+import sys
+import subprocess
+import pytest
+from xia_framework.tools import Cli
+
+
+@pytest.fixture
+def cli_backend():
+    yield Cli
+    Cli.reset()
+
+
+class TestCassette:
+    def test_record_replay(self, cli_backend, tmp_path, mocker):
+        cassette_file = tmp_path / "cassette.json"
+        Cli.configure("record", str(cassette_file))
+        assert Cli.run("echo first", stdout=subprocess.PIPE, text=True, shell=True).stdout == "first\n"
+        assert Cli.run(["sh", "-c", "echo second; exit 3"], stdout=subprocess.PIPE).returncode == 3
+        with pytest.raises(subprocess.CalledProcessError):
+            Cli.run("exit 4", shell=True, check=True)
+        assert len(Cli.get_backend()[1].load_records()) == 3
+
+        run = mocker.patch("subprocess.run")
+        Cli.configure("replay", str(cassette_file), replay_latency="recorded")
+        assert Cli.run("echo first", stdout=subprocess.PIPE, text=True, shell=True).stdout == "first\n"
+        r = Cli.run(["sh", "-c", "echo second; exit 3"], stdout=subprocess.PIPE)
+        assert (r.returncode, r.stdout) == (3, b"second\n")
+        with pytest.raises(subprocess.CalledProcessError):
+            Cli.run("exit 4", shell=True, check=True)
+        with pytest.raises(ValueError):
+            Cli.run("echo unknown", shell=True)
+        run.assert_not_called()
+
+    def test_working_directory_key(self, cli_backend, tmp_path, monkeypatch, mocker):
+        monkeypatch.chdir(tmp_path)
+        for app_name in ("app1", "app2"):
+            (tmp_path / app_name).mkdir()
+            (tmp_path / app_name / "name").write_text(app_name)
+        cassette_file = tmp_path / "cassette.json"
+        Cli.configure("record", str(cassette_file))
+        cmd = [sys.executable, "-c", "print(open('name').read())"]
+        for app_name in ("app1", "app2"):
+            Cli.run(cmd, cwd=str(tmp_path / app_name), stdout=subprocess.PIPE, text=True)
+        assert Cli.get_backend()[1].load_records()[0]["cmd"] == "python -c print(open('name').read())"
+
+        mocker.patch("subprocess.run")
+        Cli.configure("replay", str(cassette_file))
+        for app_name in ("app2", "app1"):  # Replayed in another order
+            assert Cli.run(cmd, cwd=app_name, stdout=subprocess.PIPE, text=True).stdout == app_name + "\n"
+
+    def test_environment_configuration(self, cli_backend, tmp_path, monkeypatch):
+        cassette_file = tmp_path / "cassette.json"
+        cassette_file.write_text('{"records": [{"cmd": "gh repo view", "stdout": "{}", "stderr": "", '
+                                 '"returncode": 0, "duration": 10}]}')
+        Cli._backend = None
+        monkeypatch.setenv(Cli.ENV_REPLAY, str(cassette_file))
+        monkeypatch.setenv(Cli.ENV_REPLAY_LATENCY, "0.01")
+        assert Cli.run("gh repo view", stdout=subprocess.PIPE, text=True, shell=True).stdout == "{}"
+        assert Cli.get_backend()[0] == "replay"
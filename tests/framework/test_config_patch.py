@@ -0,0 +1,31 @@
+import os
+from xia_framework.base import Base
+from xia_framework.config_patch import ConfigPatcher
+
+
+class TestConfigPatch:
+    def test_patch_report(self, tmp_path):
+        landscape_path = tmp_path / "landscape.yaml"
+        landscape_path.write_text("settings:\n  # realm_name:\n  # realm_name_suffix:\n  foundation_name: f\n"
+                                  "  # cosmos_name: old\n")
+        tfstate_path = tmp_path / "tfstate.yaml"
+        tfstate_path.write_text("# tf_bucket:\n")
+        patch_report = Base._config_patch({
+            str(landscape_path): {"realm_name:": "  realm_name: realm\n", "cosmos_name:": "  cosmos_name: cosmos\n",
+                                  "application_name:": "  application_name: app\n"},
+            str(tfstate_path): {"tf_bucket:": "tf_bucket: bucket\n"},
+            str(tmp_path / "missing.yaml"): {"key:": "key: value\n"},
+        })
+        assert landscape_path.read_text() == ("settings:\n  realm_name: realm\n  # realm_name_suffix:\n"
+                                              "  foundation_name: f\n  cosmos_name: cosmos\n")
+        assert tfstate_path.read_text() == "tf_bucket: bucket\n"
+        assert patch_report[str(landscape_path)] == {"matched": ["realm_name:", "cosmos_name:"],
+                                                     "unmatched": ["application_name:"]}
+        assert patch_report[str(tmp_path / "missing.yaml")] == {"matched": [], "unmatched": ["key:"]}
+        assert sorted(os.listdir(tmp_path)) == ["landscape.yaml", "tfstate.yaml"]
+
+    def test_first_key_wins(self, tmp_path):
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text("# type: old\n")
+        ConfigPatcher({"type": "first\n", "type:": "second\n"}).patch_file(str(config_path))
+        assert config_path.read_text() == "first\n"
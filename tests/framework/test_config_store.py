@@ -0,0 +1,61 @@
+import yaml
+from xia_framework.config_store import ConfigStore
+
+
+class TestConfigStore:
+    def test_parse_once_until_changed(self, tmp_path, mocker):
+        config_file = tmp_path / "landscape.yaml"
+        config_file.write_text("settings:\n  realm_name: realm\n")
+        store = ConfigStore()
+        safe_load = mocker.patch("yaml.load", wraps=yaml.load)
+        assert store.load(str(config_file)) == {"settings": {"realm_name": "realm"}}
+        assert store.load(str(config_file)) == {"settings": {"realm_name": "realm"}}
+        assert safe_load.call_count == 1
+
+        config_file.write_text("settings:\n  realm_name: other-realm\n")
+        assert store.load(str(config_file)) == {"settings": {"realm_name": "other-realm"}}
+        assert safe_load.call_count == 2
+
+    def test_returned_objects_are_copies(self, tmp_path):
+        config_file = tmp_path / "modules.yaml"
+        config_file.write_text("module_a:\n  package: package-a\n")
+        store = ConfigStore()
+        store.load(str(config_file))["module_a"]["_class"] = object
+        assert store.load(str(config_file)) == {"module_a": {"package": "package-a"}}
+
+    def test_write_through(self, tmp_path):
+        config_file = tmp_path / "applications.yaml"
+        config_file.write_text("# Applications\napp_a:\n")
+        store = ConfigStore()
+        app_dict = store.load_rt(str(config_file))
+        app_dict["app_b"] = None
+        store.save_rt(str(config_file), app_dict)
+        assert "# Applications" in config_file.read_text()
+        assert list(store.load_rt(str(config_file))) == ["app_a", "app_b"]
+        assert store.load(str(config_file)) == {"app_a": None, "app_b": None}
+
+    def test_persistent_cache(self, tmp_path, mocker):
+        config_file = tmp_path / "modules.yaml"
+        config_file.write_text("module_a:\n  package: package-a\n")
+        cache_dir = tmp_path / ".xia" / "config_cache"
+        yaml_load = mocker.patch("yaml.load", wraps=yaml.load)
+        assert ConfigStore(cache_dir=str(cache_dir)).load(str(config_file)) == {"module_a": {"package": "package-a"}}
+        assert len(list(cache_dir.iterdir())) == 1
+        # A new process (new store) gets the parsed content from the cache
+        assert ConfigStore(cache_dir=str(cache_dir)).load(str(config_file)) == {"module_a": {"package": "package-a"}}
+        assert yaml_load.call_count == 1
+
+        config_file.write_text("module_b:\n  package: package-b\n")
+        assert ConfigStore(cache_dir=str(cache_dir)).load(str(config_file)) == {"module_b": {"package": "package-b"}}
+        assert yaml_load.call_count == 2
+
+    def test_persistent_cache_json_only(self, tmp_path, mocker):
+        config_file = tmp_path / "landscape.yaml"
+        config_file.write_text("settings:\n  created: 2024-05-01\n  1: one\n")
+        cache_dir = tmp_path / ".xia" / "config_cache"
+        yaml_load = mocker.patch("yaml.load", wraps=yaml.load)
+        for _ in range(2):
+            settings = ConfigStore(cache_dir=str(cache_dir)).load(str(config_file))["settings"]
+            assert settings[1] == "one" and settings["created"].year == 2024
+        assert yaml_load.call_count == 2  # Not representable in json, so not cached
+        assert not cache_dir.exists() or not list(cache_dir.iterdir())
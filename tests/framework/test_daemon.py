@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import signal
+import subprocess
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="Unix socket server")
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ENV = {**os.environ, "PYTHONPATH": ROOT_DIR}
+
+
+@pytest.fixture
+def server(tmp_path):
+    server_process = subprocess.Popen([sys.executable, "-m", "xia_framework.application", "serve"], cwd=tmp_path,
+                                      env=ENV, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    socket_path = tmp_path / ".xia" / "application.sock"
+    for _ in range(100):
+        if socket_path.exists():
+            break
+        time.sleep(0.05)
+    yield socket_path
+    server_process.send_signal(signal.SIGINT)
+    server_process.wait(timeout=10)
+    assert not socket_path.exists()
+
+
+class TestDaemon:
+    def run_client(self, cwd, *args):
+        return subprocess.run([sys.executable, "-m", "xia_framework.application", "--daemon", *args], cwd=cwd, env=ENV,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+    def test_forward(self, server, tmp_path):
+        r = self.run_client(tmp_path, "--help")
+        assert r.returncode == 0
+        assert "serve" in r.stdout
+        r = self.run_client(tmp_path, "plan", "--unknown-option")
+        assert r.returncode == 2
+        assert "--unknown-option" in r.stderr
+        assert "No server listening" not in r.stdout
+
+    def test_local_fallback(self, tmp_path):
+        r = self.run_client(tmp_path, "--help")
+        assert r.returncode == 0
+        assert "No server listening" in r.stdout
+
+    def test_backend_reset_between_commands(self, tmp_path, monkeypatch):
+        from xia_framework.application import Application
+        from xia_framework.daemon import Daemon
+        from xia_framework.tools import Cli
+        monkeypatch.chdir(tmp_path)
+        application = Application()
+        backends = []
+
+        def main(argv):
+            if argv:
+                Cli.configure("replay", argv[1])
+            backends.append(Cli.get_backend()[0])
+
+        application.main = main
+        daemon = Daemon(application)
+        try:
+            for argv in [["--replay", str(tmp_path / "cassette.json")], []]:
+                daemon.run_command(argv, [os.open(os.devnull, os.O_RDWR) for _ in range(3)])
+        finally:
+            Cli.reset()
+        assert backends == ["replay", "real"]
+        assert Cli.ENV_REPLAY not in os.environ
+
+    def test_client_environment(self, tmp_path, monkeypatch):
+        from xia_framework.application import Application
+        from xia_framework.daemon import Daemon
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("TF_VAR_region", "server")
+        application = Application()
+        values = []
+        application.main = lambda argv: values.append(os.environ.get("TF_VAR_region"))
+        client_env = {"TF_VAR_region": "client", "GH_TOKEN": "token", "XIA_DAEMON": "1"}
+        Daemon(application).run_command([], [os.open(os.devnull, os.O_RDWR) for _ in range(3)], env=client_env)
+        assert values == ["client"]
+        assert os.environ["TF_VAR_region"] == "server"
+        assert "GH_TOKEN" not in os.environ
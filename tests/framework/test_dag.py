@@ -0,0 +1,45 @@
+import time
+import threading
+import pytest
+from xia_framework.dag import DagExecutor
+
+
+class TestDagExecutor:
+    def test_schedule(self):
+        steps = {
+            "a": {"run": None},
+            "b": {"run": None, "depends_on": ["a"]},
+            "c": {"run": None},
+            "d": {"run": None, "depends_on": ["b", "c"]},
+        }
+        assert DagExecutor.get_schedule(steps) == [["a", "c"], ["b"], ["d"]]
+
+    def test_cycle_and_unknown_dependency(self):
+        with pytest.raises(ValueError, match="Cycle"):
+            DagExecutor({"a": {"run": None, "depends_on": ["b"]}, "b": {"run": None, "depends_on": ["a"]}})
+        with pytest.raises(ValueError, match="unknown"):
+            DagExecutor({"a": {"run": None, "depends_on": ["z"]}})
+
+    def test_run_concurrently_with_results(self):
+        barrier = threading.Barrier(2, timeout=5)
+        steps = {
+            "a": {"run": lambda results: (barrier.wait(), 1)[1]},
+            "b": {"run": lambda results: (barrier.wait(), 2)[1]},
+            "c": {"run": lambda results: results["a"] + results["b"], "depends_on": ["a", "b"]},
+        }
+        assert DagExecutor(steps, max_workers=2).run() == {"a": 1, "b": 2, "c": 3}
+
+    def test_failure_stops_dependents(self):
+        started = []
+
+        def fail(results):
+            raise RuntimeError("failed")
+
+        steps = {
+            "a": {"run": fail},
+            "b": {"run": lambda results: started.append("b") or time.sleep(0.05)},
+            "c": {"run": lambda results: started.append("c"), "depends_on": ["a"]},
+        }
+        with pytest.raises(RuntimeError):
+            DagExecutor(steps).run()
+        assert "c" not in started
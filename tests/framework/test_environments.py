@@ -0,0 +1,58 @@
+import os
+from xia_framework.base import Base
+
+
+class TestEnableEnvironments:
+    def test_incremental_sync(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "config").mkdir()
+        (tmp_path / "config" / "landscape.yaml").write_text("settings:\n  env_link_mode: copy\n")
+        base_dir = tmp_path / "iac" / "environments" / "base"
+        (base_dir / ".terraform").mkdir(parents=True)
+        (base_dir / ".terraform" / "terraform.tfstate").write_text("{}")
+        (base_dir / "main.tf").write_text("main")
+        (base_dir / "variables.tf").write_text("variables")
+        (base_dir / "outputs.tf").write_text("outputs")
+        dev_dir = tmp_path / "iac" / "environments" / "dev"
+
+        report = Base().enable_environments("dev")
+        assert sorted(report["created"]) == ["main.tf", "outputs.tf", "variables.tf"]
+        assert not (dev_dir / ".terraform").exists()
+
+        (dev_dir / "variables.tf").write_text("dev variables")  # Environment specific override
+        (dev_dir / "dev.tfvars").write_text("dev only")
+        (base_dir / "main.tf").write_text("new main")
+        (base_dir / "variables.tf").write_text("new variables")
+        os.remove(base_dir / "outputs.tf")
+        report = Base().enable_environments("dev")
+        assert report == {"created": [], "updated": ["main.tf"], "removed": ["outputs.tf"], "kept": ["variables.tf"]}
+        assert (dev_dir / "main.tf").read_text() == "new main"
+        assert (dev_dir / "variables.tf").read_text() == "dev variables"
+        assert (dev_dir / "dev.tfvars").read_text() == "dev only"
+
+    def test_hardlink(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "config").mkdir()
+        (tmp_path / "config" / "landscape.yaml").write_text("settings:\n  env_link_mode: hardlink\n")
+        base_dir = tmp_path / "iac" / "environments" / "base"
+        base_dir.mkdir(parents=True)
+        (base_dir / "main.tf").write_text("main")
+        Base().enable_environments("dev")
+        assert os.path.samefile(base_dir / "main.tf", tmp_path / "iac" / "environments" / "dev" / "main.tf")
+
+    def test_override_default_mode(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "config").mkdir()
+        (tmp_path / "config" / "landscape.yaml").write_text("settings:\n")
+        base_dir = tmp_path / "iac" / "environments" / "base"
+        base_dir.mkdir(parents=True)
+        (base_dir / "vars.tfvars").write_text("value = 1")
+        Base().enable_environments("dev")
+        Base().enable_environments("sit")
+        dev_dir, sit_dir = tmp_path / "iac" / "environments" / "dev", tmp_path / "iac" / "environments" / "sit"
+        with open(dev_dir / "vars.tfvars", "w") as file:  # In place edition
+            file.write("value = 2")
+        assert (base_dir / "vars.tfvars").read_text() == "value = 1"
+        assert (sit_dir / "vars.tfvars").read_text() == "value = 1"
+        assert Base().enable_environments("dev")["kept"] == ["vars.tfvars"]
+        assert (dev_dir / "vars.tfvars").read_text() == "value = 2"
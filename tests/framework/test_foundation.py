@@ -0,0 +1,134 @@
+import os
+import subprocess
+import pytest
+import yaml
+from xia_framework.foundation import Foundation
+
+
+@pytest.fixture
+def foundation_workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    (config_dir / "landscape.yaml").write_text("settings:\n")
+    (config_dir / "modules.yaml").write_text(
+        "module-a:\n  package: pkg-a\n  activate_scope:\n  - app-0\nmodule-b:\n  package: pkg-b\n"
+    )
+    (config_dir / "applications.yaml").write_text("app-0:\n")
+    (config_dir / "packages.yaml").write_text("repositories:\n  default:\npackages:\n")
+    Foundation.config_store.invalidate()
+    yield config_dir
+    Foundation.config_store.invalidate()
+
+
+class TestCreateApps:
+    def test_manifest(self, foundation_workspace):
+        manifest_file = foundation_workspace / "apps.yaml"
+        manifest_file.write_text(
+            "app-1:\n  modules: module-a,module-b\n  visibility: private\n"
+            "app-2:\n  modules: [module-a, module-a]\n"
+        )
+        foundation = Foundation()
+        assert foundation.create_apps(foundation.load_app_manifest(str(manifest_file))) == {}
+        module_dict = yaml.safe_load((foundation_workspace / "modules.yaml").read_text())
+        assert module_dict["module-a"]["activate_scope"] == ["app-0", "app-1", "app-2"]
+        assert module_dict["module-b"]["activate_scope"] == ["app-1"]
+        app_dict = yaml.safe_load((foundation_workspace / "applications.yaml").read_text())
+        assert app_dict == {"app-0": None, "app-1": {"visibility": "private"}, "app-2": None}
+
+    def test_manifest_names(self, foundation_workspace):
+        manifest_file = foundation_workspace / "apps.yaml"
+        manifest_file.write_text(
+            "- name: app-1\n  modules: module-a\n- modules: module-b\n- name: app-1\n  modules: module-b\n"
+            "- name: app-2\n"
+        )
+        foundation = Foundation()
+        errors = foundation.create_apps(foundation.load_app_manifest(str(manifest_file)), raise_errors=False)
+        assert errors == {"app-1": ["Application app-1 is defined several times in the manifest"],
+                          "<entry 2>": ["Manifest entry 2 has no name"]}
+        with pytest.raises(SystemExit):
+            foundation.main(["create-apps"])
+
+    def test_validation_before_write(self, foundation_workspace):
+        modules_before = (foundation_workspace / "modules.yaml").read_text()
+        app_configs = {
+            "app-1": {"modules": ["module-a"]},
+            "app-0": {"modules": ["module-b"]},
+            "app-3": {"modules": ["module-x"], "color": "blue"},
+        }
+        with pytest.raises(ValueError):
+            Foundation().create_apps(app_configs)
+        errors = Foundation().create_apps(app_configs, raise_errors=False)
+        assert sorted(errors) == ["app-0", "app-3"]
+        assert len(errors["app-3"]) == 2
+        assert (foundation_workspace / "modules.yaml").read_text() == modules_before
+        with pytest.raises(ValueError, match="already exists"):
+            Foundation().create_app("app-0", ["module-a"])
+
+
+class TestRunApps:
+    def test_selection(self, foundation_workspace):
+        (foundation_workspace / "applications.yaml").write_text("app-0:\napp-1:\napp-2:\n")
+        foundation = Foundation()
+        assert foundation.get_app_names() == ["app-0", "app-1", "app-2"]
+        assert foundation.get_app_names(app_names="app-2,app-1") == ["app-2", "app-1"]
+        assert foundation.get_app_names(module_name="module-a") == ["app-0"]
+        with pytest.raises(ValueError):
+            foundation.get_app_names(app_names="app-9")
+
+    def test_fan_out(self, foundation_workspace, tmp_path, mocker):
+        (foundation_workspace / "landscape.yaml").write_text(f"settings:\n  apps_dir: {tmp_path / 'apps'}\n")
+        (foundation_workspace / "applications.yaml").write_text("app-0:\napp-1:\n  repository_name: repo-1\n")
+        (tmp_path / "apps" / "app-0").mkdir(parents=True)
+        clone_repo = mocker.patch("xia_framework.foundation.CliGH.clone_repo",
+                                  side_effect=lambda owner, name, target_dir: os.makedirs(target_dir))
+
+        def run_app(cmd, cwd, **kwargs):
+            return subprocess.CompletedProcess(cmd, 0 if cwd.endswith("app-0") else 2, stdout=f"{cwd} output")
+
+        cli_run = mocker.patch("xia_framework.foundation.Cli.run", side_effect=run_app)
+        app_results = Foundation().run_apps(["app-0", "app-1"], "plan", env_name="dev", max_workers=2)
+        assert {app_name: result["returncode"] for app_name, result in app_results.items()} == {"app-0": 0, "app-1": 2}
+        assert clone_repo.call_args[0][1:] == ("repo-1", str(tmp_path / "apps" / "repo-1"))
+        assert cli_run.call_args[0][0][-4:] == ["--skip-install", "plan", "-e", "dev"]
+        with pytest.raises(ValueError):
+            Foundation().run_apps(["app-0"], "apply", env_name="dev")
+
+    def test_install_once(self, foundation_workspace, tmp_path, mocker):
+        app_dirs = {}
+        for app_name, version in [("app-0", "1.0.0"), ("app-1", "1.0.0"), ("app-2", "2.0.0")]:
+            app_dirs[app_name] = tmp_path / "apps" / app_name
+            (app_dirs[app_name] / "config").mkdir(parents=True)
+            (app_dirs[app_name] / "config" / "packages.yaml").write_text(
+                f"repositories:\n  default:\npackages:\n  xia-not-installed-package:\n    version: {version}\n"
+            )
+        cli_run = mocker.patch("xia_framework.foundation.Cli.run")
+        foundation = Foundation()
+        foundation.install_app_requirements({k: str(v) for k, v in app_dirs.items() if k != "app-2"})
+        assert cli_run.call_count == 1
+        assert cli_run.call_args[0][0][:3] == ["pip", "install", "xia-not-installed-package==1.0.0"]
+        with pytest.raises(ValueError):
+            foundation.install_app_requirements({k: str(v) for k, v in app_dirs.items()})
+
+
+class TestPlan:
+    def test_saved_plan_reused(self, foundation_workspace, mocker):
+        (foundation_workspace / "landscape.yaml").write_text(
+            "settings:\n  realm_name: realm\n  foundation_name: foundation\n  tf_plugin_cache_dir:\n"
+        )
+        (foundation_workspace / "core").mkdir()
+        (foundation_workspace / "core" / "tfstate.yaml").write_text("tf_bucket: bucket\n")
+        base_dir = foundation_workspace.parent / "iac" / "environments" / "base"
+        base_dir.mkdir(parents=True)
+
+        def run(cmd, *args, **kwargs):
+            if " plan -out=" in cmd:
+                (base_dir / "tfplan").write_text("plan")
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+
+        terraform_run = mocker.patch("xia_framework.base.subprocess.run", side_effect=run)
+        mocker.patch.object(Foundation, "prepare")
+        Foundation().main(["plan"])
+        assert terraform_run.call_args[0][0].endswith("base plan -out=tfplan")
+        Foundation().main(["apply", "-y", "yes"])
+        assert terraform_run.call_args[0][0].endswith("base apply tfplan")
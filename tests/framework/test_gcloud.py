@@ -0,0 +1,63 @@
+import subprocess
+import pytest
+from xia_framework.tools import CliGCloud
+from xia_framework.tools.rescache import ResourceCache
+from xia_framework.singularity import GcpSingularity
+
+
+@pytest.fixture
+def gcloud_calls(tmp_path, mocker):
+    mocker.patch.object(CliGCloud, "resource_cache", ResourceCache(str(tmp_path / "cache")))
+    calls = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        if cmd.startswith("gcloud services list"):
+            return subprocess.CompletedProcess(cmd, 0, stdout="iam.googleapis.com\nstorage.googleapis.com\n", stderr="")
+        if cmd.startswith("gcloud billing accounts list"):
+            return subprocess.CompletedProcess(cmd, 0, stdout="billing-1\n", stderr="")
+        if cmd.startswith("gcloud billing projects describe"):
+            return subprocess.CompletedProcess(cmd, 0, stdout="False\n", stderr="")
+        if "describe" in cmd:
+            return subprocess.CompletedProcess(cmd, 1, stdout="", stderr="NOT_FOUND")
+        return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    mocker.patch("xia_framework.tools.cli.subprocess.run", side_effect=run)
+    return calls
+
+
+class TestResourceCache:
+    def test_rerun_without_api_calls(self, gcloud_calls):
+        CliGCloud.create_gcp_project("cosmos")
+        CliGCloud.link_gcp_billing_project("cosmos", "billing-1")
+        CliGCloud.activate_gcp_services("cosmos", ["iam", "storage", "cloudbilling"])
+        CliGCloud.create_gcs_bucket("cosmos", "bucket", "eu")
+        assert [cmd.split()[1] + " " + cmd.split()[2] for cmd in gcloud_calls] == [
+            "projects describe", "projects create", "billing projects", "billing projects", "services list",
+            "services enable", "storage buckets", "storage buckets"
+        ]
+        assert "cloudbilling.googleapis.com --project" in gcloud_calls[5]
+        assert "iam" not in gcloud_calls[5]
+
+        gcloud_calls.clear()
+        CliGCloud.create_gcp_project("cosmos")
+        CliGCloud.link_gcp_billing_project("cosmos", "billing-1")
+        CliGCloud.activate_gcp_services("cosmos", ["iam", "storage", "cloudbilling"])
+        CliGCloud.create_gcs_bucket("cosmos", "bucket", "eu")
+        assert gcloud_calls == []
+
+    def test_bigbang_rerun_without_api_calls(self, gcloud_calls):
+        bigbang_kwargs = {"cosmos_project": "cosmos", "bucket_name": "bucket", "bucket_region": "eu"}
+        GcpSingularity.bigbang(**bigbang_kwargs)
+        assert gcloud_calls[0].startswith("gcloud billing accounts list")
+        gcloud_calls.clear()
+        GcpSingularity.bigbang(**bigbang_kwargs)
+        assert gcloud_calls == []
+
+    def test_expired_entries(self, tmp_path, mocker):
+        resource_cache = ResourceCache(str(tmp_path), ttl=10)
+        resource_cache.add("projects", "cosmos")
+        assert resource_cache.exists("projects", "cosmos")
+        mocker.patch("xia_framework.tools.rescache.time.time", return_value=10 ** 10)
+        assert not resource_cache.exists("projects", "cosmos")
+        assert not ResourceCache(str(tmp_path), ttl=0).exists("projects", "cosmos")
@@ -0,0 +1,18 @@
+import json
+import subprocess
+from xia_framework.tools import CliGH
+
+
+class TestCliGH:
+    def test_variables_fetched_once(self, mocker):
+        mocker.patch.object(CliGH, "_variable_cache", {})
+        variables = [{"name": "COSMOS_NAME", "value": "cosmos"}, {"name": "REALM_NAME", "value": "realm"}]
+        run = mocker.patch("xia_framework.tools.gh.subprocess.run",
+                           return_value=subprocess.CompletedProcess("", 0, json.dumps(variables), ""))
+        assert CliGH.get_gh_action_var("cosmos_name") == "cosmos"
+        assert CliGH.get_gh_action_var("REALM_NAME") == "realm"
+        assert CliGH.get_gh_action_var("foundation_name") is None
+        assert run.call_count == 1
+        CliGH.get_gh_action_var("cosmos_name", env_name="dev")
+        assert run.call_count == 2
+        assert run.call_args[0][0].endswith("-e dev")
@@ -0,0 +1,86 @@
+import sys
+import textwrap
+import pytest
+import yaml
+from xia_framework.base import Base
+
+MODULE_PACKAGE = textwrap.dedent("""
+    import time
+    rendered = []
+    modules = {"module-a": "ModuleA", "module-b": "ModuleB", "module-c": "ModuleC"}
+
+
+    class Module:
+        def enable(self, module_dir, **kwargs):
+            time.sleep(0.01)
+            rendered.append(self.__class__.__name__)
+
+        activate = enable
+
+
+    class ModuleA(Module):
+        pass
+
+
+    class ModuleB(Module):
+        pass
+
+
+    class ModuleC(Module):
+        pass
+""")
+
+
+@pytest.fixture
+def module_workspace(tmp_path, monkeypatch):
+    package_dir = tmp_path / "xia_fake_load_modules"
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text(MODULE_PACKAGE)
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "landscape.yaml").write_text("settings:\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path
+    sys.modules.pop("xia_fake_load_modules", None)
+
+
+class TestLoadModules:
+    def test_dependency_order(self, module_workspace):
+        module_dict = {
+            "module-c": {"package": "xia-fake-load-modules", "events": {"deploy": None}, "depends_on": ["module-b"]},
+            "module-b": {"package": "xia-fake-load-modules", "events": {"activate": None},
+                         "depends_on": ["module-a", "module-outside"]},
+            "module-a": {"package": "xia-fake-load-modules", "events": {"deploy": None}},
+        }
+        (module_workspace / "config" / "modules.yaml").write_text(yaml.dump(module_dict))
+        loaded_modules = Base().load_modules(max_workers=4)
+        assert sys.modules["xia_fake_load_modules"].rendered == ["ModuleA", "ModuleB", "ModuleC"]
+        assert loaded_modules["module-a"]["_class"].__name__ == "ModuleA"
+
+    def test_cycle(self, module_workspace):
+        module_dict = {
+            "module-a": {"package": "xia-fake-load-modules", "depends_on": ["module-b"]},
+            "module-b": {"package": "xia-fake-load-modules", "depends_on": ["module-a"]},
+        }
+        (module_workspace / "config" / "modules.yaml").write_text(yaml.dump(module_dict))
+        with pytest.raises(ValueError, match="Cycle"):
+            Base().load_modules()
+        assert sys.modules["xia_fake_load_modules"].rendered == []
+
+    def test_unchanged_modules_skipped(self, module_workspace):
+        dist_info = module_workspace / "xia_fake_load_modules-1.0.0.dist-info"
+        dist_info.mkdir()
+        (dist_info / "METADATA").write_text("Metadata-Version: 2.1\nName: xia-fake-load-modules\nVersion: 1.0.0\n")
+        module_dict = {
+            "module-a": {"package": "xia-fake-load-modules", "events": {"deploy": None}},
+            "module-b": {"package": "xia-fake-load-modules", "events": {"deploy": None}},
+        }
+        (module_workspace / "config" / "modules.yaml").write_text(yaml.dump(module_dict))
+        Base().load_modules()
+        assert sorted(sys.modules["xia_fake_load_modules"].rendered) == ["ModuleA", "ModuleB"]
+
+        module_dict["module-b"]["events"]["deploy"] = {"region": "eu"}
+        (module_workspace / "config" / "modules.yaml").write_text(yaml.dump(module_dict))
+        sys.modules["xia_fake_load_modules"].rendered.clear()
+        Base().load_modules()
+        assert sys.modules["xia_fake_load_modules"].rendered == ["ModuleB"]
@@ -0,0 +1,34 @@
+import pstats
+import threading
+from xia_framework.application import Application
+
+
+class TestProfiling:
+    def test_profile_without_file(self, tmp_path, monkeypatch, mocker):
+        monkeypatch.chdir(tmp_path)
+        application = Application()
+        run = mocker.Mock()
+        application.run_book["plan"]["run"] = run
+        application.main(["--profile", "plan"])
+        run.assert_called_once()
+        assert (tmp_path / "xia.pstats").exists()
+
+    def test_main_profile_option(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "config").mkdir()
+        (tmp_path / "config" / "modules.yaml").write_text("module-a:\n  package: pytest\n")
+        application = Application()
+        called_threads = []
+
+        def init_config(args):
+            called_threads.append(threading.current_thread())
+            sum(i * i for i in range(10000))
+
+        application.run_book["init-config"]["run"] = init_config
+        application.main(["--profile", "--profile-file", "out.pstats", "--profile-packages", "init-config"])
+        assert called_threads == [threading.main_thread()]
+        assert application.module_workers == 1
+        assert pstats.Stats(str(tmp_path / "out.pstats")).total_calls > 0
+        output = capsys.readouterr().out
+        assert "cumulative" in output
+        assert "pytest" in output and "(others)" in output
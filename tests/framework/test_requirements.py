@@ -0,0 +1,106 @@
+import json
+import importlib.metadata
+from xia_framework.base import Base
+
+
+class TestRequirements:
+    def test_missing_packages(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        base = Base()
+        pytest_version = importlib.metadata.version("pytest")
+        needed_packages = {
+            "pytest": f"pytest=={pytest_version}",
+            "pyyaml": "pyyaml==0.0.1",
+            "xia-not-installed-package": "xia-not-installed-package",
+            "ruamel.yaml": "git+https://github.com/x-i-a/ruamel.yaml#egg=ruamel.yaml",
+        }
+        fingerprint = base.get_requirements_fingerprint(needed_packages, "https://pypi.org/simple")
+        assert list(base.get_missing_packages(needed_packages, fingerprint)) == [
+            "pyyaml", "xia-not-installed-package", "ruamel.yaml"
+        ]
+        base.save_requirements_fingerprint(fingerprint)
+        assert "ruamel.yaml" not in base.get_missing_packages(needed_packages, fingerprint)
+
+    def test_fingerprint_includes_index(self):
+        needed_packages = {"xia-module": "xia-module==1.0.0"}
+        assert (Base.get_requirements_fingerprint(needed_packages, "https://pypi.org/simple") !=
+                Base.get_requirements_fingerprint(needed_packages, "https://example.com/simple"))
+
+    def test_wheelhouse_options(self, tmp_path, monkeypatch, mocker):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "config").mkdir()
+        (tmp_path / "config" / "landscape.yaml").write_text("settings:\n  pip_index_url: https://example.com/simple\n")
+        packages_yaml = tmp_path / "config" / "packages.yaml"
+        packages_yaml.write_text("repositories:\n  default:\npackages:\n  xia-not-installed-package:\n")
+        base = Base()
+        assert base.get_pip_options() == ["--index-url=https://example.com/simple"]
+        cli_run = mocker.patch("xia_framework.base.Cli.run")
+        base.build_wheelhouse()
+        assert cli_run.call_args[0][0][:4] == ["pip", "wheel", "-w", "wheelhouse"]
+        assert "xia-not-installed-package" in cli_run.call_args[0][0]
+
+        packages_yaml.write_text("repositories:\n  default:\n    find_links: wheels\n    no_index: true\n"
+                                 "packages:\n  xia-not-installed-package:\n")
+        assert base.get_pip_options() == ["--find-links=wheels", "--no-index"]
+        base.install_requirements()
+        assert cli_run.call_args[0][0] == ["pip", "install", "xia-not-installed-package",
+                                           "--find-links=wheels", "--no-index"]
+
+    def test_lock(self, tmp_path, monkeypatch, mocker):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "config").mkdir()
+        (tmp_path / "config" / "landscape.yaml").write_text("settings:\n")
+        packages_yaml = tmp_path / "config" / "packages.yaml"
+        packages_yaml.write_text("repositories:\n  default:\npackages:\n  xia-module:\n")
+        pip_report = {"install": [
+            {"metadata": {"name": "xia-module", "version": "1.0.0"},
+             "download_info": {"url": "https://example.com/xia_module-1.0.0.whl",
+                               "archive_info": {"hashes": {"sha256": "abc"}}}},
+            {"metadata": {"name": "PyYAML", "version": "6.0"},
+             "download_info": {"url": "https://example.com/PyYAML-6.0.whl", "archive_info": {"hash": "sha256=def"}}},
+            {"metadata": {"name": "xia-git", "version": "0.1"},
+             "download_info": {"url": "https://github.com/x-i-a/xia-git",
+                               "vcs_info": {"vcs": "git", "commit_id": "1234"}}},
+        ]}
+
+        def write_report(cmd, **kwargs):
+            if "--report" in cmd:
+                with open(cmd[cmd.index("--report") + 1], "w") as file:
+                    json.dump(pip_report, file)
+
+        cli_run = mocker.patch("xia_framework.base.Cli.run", side_effect=write_report)
+        base = Base()
+        base.lock_requirements()
+        lock_lines = (tmp_path / "config" / "packages.lock").read_text().splitlines()
+        assert lock_lines[2] == f"# platform:{Base.get_platform_tag()}"
+        assert lock_lines[3:] == ["PyYAML==6.0 --hash=sha256:def",
+                                  "xia-git @ git+https://github.com/x-i-a/xia-git@1234",
+                                  "xia-module==1.0.0 --hash=sha256:abc"]
+
+        cli_run.reset_mock()
+        base.install_requirements()
+        assert cli_run.call_count == 2
+        assert cli_run.call_args_list[0][0][0][:5] == ["pip", "install", "--no-deps", "--require-hashes", "-r"]
+        assert cli_run.call_args_list[1][0][0][:4] == ["pip", "install", "--no-deps",
+                                                       "xia-git @ git+https://github.com/x-i-a/xia-git@1234"]
+        cli_run.reset_mock()
+        base.install_requirements()
+        assert cli_run.call_count == 0
+
+        packages_yaml.write_text("repositories:\n  default:\npackages:\n  xia-other:\n")
+        base.install_requirements()  # Outdated lock, back to packages.yaml resolution
+        assert cli_run.call_args[0][0][:3] == ["pip", "install", "xia-other"]
+
+    def test_lock_other_platform(self, tmp_path, monkeypatch, mocker):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "config").mkdir()
+        (tmp_path / "config" / "landscape.yaml").write_text("settings:\n")
+        (tmp_path / "config" / "packages.yaml").write_text("repositories:\n  default:\npackages:\n  xia-module:\n")
+        base = Base()
+        (tmp_path / "config" / "packages.lock").write_text(
+            f"# Generated by lock command, do not edit\n# packages.yaml sha256:{base.get_package_yaml_fingerprint()}\n"
+            "# platform:cpython3.99-other-platform\nxia-module==1.0.0 --hash=sha256:abc\n"
+        )
+        cli_run = mocker.patch("xia_framework.base.Cli.run")
+        base.install_requirements()  # Locked for another platform, back to packages.yaml resolution
+        assert cli_run.call_args[0][0][:3] == ["pip", "install", "xia-module"]
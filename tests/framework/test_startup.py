@@ -0,0 +1,43 @@
+import re
+import subprocess
+import sys
+import pytest
+from xia_framework.application import Application
+
+# Cumulative import time budget of a framework component in microseconds
+IMPORT_TIME_BUDGET = 150000
+HEAVY_MODULES = ["yaml", "ruamel.yaml", "argparse", "importlib.metadata", "concurrent.futures"]
+
+
+def get_import_time(module_name: str) -> dict:
+    """Import a module in a fresh interpreter and return the cumulative import time of each module"""
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    import_times = {}
+    for line in r.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)", line)
+        if match:
+            import_times[match.group(2)] = int(match.group(1))
+    return import_times
+
+
+class TestStartup:
+    @pytest.mark.parametrize("module_name", ["xia_framework", "xia_framework.application",
+                                             "xia_framework.foundation", "xia_framework.cosmos"])
+    def test_import_budget(self, module_name):
+        import_times = get_import_time(module_name)
+        assert import_times[module_name] < IMPORT_TIME_BUDGET
+        assert not [heavy_module for heavy_module in HEAVY_MODULES if heavy_module in import_times]
+
+    def test_only_invoked_sub_parser_built(self, mocker):
+        application = Application()
+        built_parsers = []
+        for cmd, cmd_config in application.run_book.items():
+            cmd_config["cli"] = mocker.Mock(side_effect=cmd_config["cli"])
+            cmd_config["run"] = mocker.Mock()
+        application.main(["init-config"])
+        for cmd, cmd_config in application.run_book.items():
+            if cmd_config["cli"].called:
+                built_parsers.append(cmd)
+        assert built_parsers == ["init-config"]
+        application.run_book["init-config"]["run"].assert_called_once()
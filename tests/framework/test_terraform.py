@@ -0,0 +1,203 @@
+import os
+import subprocess
+import pytest
+from xia_framework.application import Application
+
+
+@pytest.fixture
+def application_workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config" / "core").mkdir(parents=True)
+    (tmp_path / "config" / "landscape.yaml").write_text(
+        "settings:\n  realm_name: realm\n  foundation_name: foundation\n  application_name: app\n"
+        f"  tf_plugin_cache_dir: {tmp_path / 'plugin-cache'}\n  tf_plugin_cache_max_mb: 1\n"
+        "environments:\n  dev:\n"
+    )
+    (tmp_path / "config" / "core" / "tfstate.yaml").write_text("tf_bucket: bucket\n")
+    (tmp_path / "iac" / "modules").mkdir(parents=True)
+    (tmp_path / "iac" / "environments" / "dev").mkdir(parents=True)
+    (tmp_path / "iac" / "environments" / "dev" / "main.tf").write_text("main")
+    yield tmp_path
+
+
+@pytest.fixture
+def terraform_run(mocker, application_workspace):
+    def run(cmd, *args, **kwargs):
+        if " plan -out=" in cmd:
+            (application_workspace / "iac" / "environments" / "dev" / "tfplan").write_text("plan")
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+    return mocker.patch("xia_framework.base.subprocess.run", side_effect=run)
+
+
+class TestSavedPlan:
+    def test_saved_plan_applied(self, terraform_run):
+        application = Application()
+        application.terraform_plan("dev")
+        application.terraform_apply("dev", auto_approve=True)
+        assert terraform_run.call_args[0][0].endswith("apply tfplan")
+
+    def test_saved_plan_needs_approval(self, terraform_run):
+        application = Application()
+        application.terraform_plan("dev")
+        application.terraform_apply("dev")
+        assert terraform_run.call_args[0][0].endswith("dev apply")
+        assert "--auto-approve" not in terraform_run.call_args[0][0]
+
+    def test_outdated_plan_not_applied(self, terraform_run, application_workspace):
+        application = Application()
+        application.terraform_plan("dev")
+        (application_workspace / "iac" / "modules" / "module.tf").write_text("new module")
+        application.terraform_apply("dev", auto_approve=True)
+        assert terraform_run.call_args[0][0].endswith("dev apply")
+
+    def test_plan_applied_once(self, terraform_run):
+        application = Application()
+        application.terraform_plan("dev")
+        application.terraform_apply("dev", auto_approve=True)
+        application.terraform_apply("dev", auto_approve=True)
+        assert terraform_run.call_args[0][0].endswith("dev apply")
+
+    def test_stale_plan_falls_back(self, terraform_run, application_workspace):
+        def run(cmd, *args, **kwargs):
+            if " plan -out=" in cmd:
+                (application_workspace / "iac" / "environments" / "dev" / "tfplan").write_text("plan")
+            if cmd.endswith("apply tfplan"):
+                return subprocess.CompletedProcess(cmd, 1, None, "Error: Saved plan is stale\n")
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+        terraform_run.side_effect = run
+        application = Application()
+        application.terraform_plan("dev")
+        r = application.terraform_apply("dev", auto_approve=True)
+        assert r.returncode == 0
+        assert terraform_run.call_args_list[-2][0][0].endswith("apply tfplan")
+        assert terraform_run.call_args[0][0].startswith("terraform --auto-approve ")
+        assert terraform_run.call_args[0][0].endswith("dev apply")
+
+
+class TestLockInspection:
+    def test_local_lock(self, application_workspace, mocker):
+        (application_workspace / "config" / "core" / "tfstate.yaml").write_text(
+            f"tf_bucket: {application_workspace / 'bucket'}\ntf_backend: local\n"
+        )
+        application = Application()
+        run = mocker.patch("xia_framework.base.subprocess.run")
+        assert application.terraform_get_lock_id("dev") is None
+        lock_dir = application_workspace / "bucket" / "realm" / "_" / "foundation" / "app" / "dev" / "terraform" / \
+            "state"
+        lock_dir.mkdir(parents=True)
+        (lock_dir / "default.tflock").write_text(
+            '{"ID": "lock-id", "Operation": "OperationTypeApply", "Who": "runner@ci", '
+            '"Created": "2024-05-01T10:00:00.123456789Z"}'
+        )
+        lock_info = application.terraform_get_lock_info("dev")
+        assert lock_info["id"] == "lock-id"
+        assert lock_info["holder"] == "runner@ci"
+        assert lock_info["age"] > 0
+        assert not run.called
+
+    def test_unknown_backend_unlock(self, application_workspace, mocker):
+        (application_workspace / "config" / "core" / "tfstate.yaml").write_text("tf_bucket: bucket\ntf_backend: s3\n")
+        application = Application()
+        prepare = mocker.patch.object(application, "prepare")
+        mocker.patch.object(application, "terraform_init")
+
+        def run(cmd, *args, **kwargs):
+            stderr = "Error acquiring the state lock\nLock Info:\n  ID:        lock-id\n" if " plan" in cmd else ""
+            return subprocess.CompletedProcess(cmd, 0, "", stderr)
+
+        run = mocker.patch("xia_framework.base.subprocess.run", side_effect=run)
+        application.unlock_environment("dev", auto_approve=True)
+        prepare.assert_called_once()
+        assert run.call_args[0][0].endswith("force-unlock lock-id")
+
+
+class TestInitFingerprint:
+    @pytest.fixture
+    def init_run(self, mocker, application_workspace):
+        def run(cmd, *args, **kwargs):
+            if " init " in cmd:
+                (application_workspace / "iac" / "environments" / "dev" / ".terraform").mkdir(exist_ok=True)
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+        return mocker.patch("xia_framework.base.subprocess.run", side_effect=run)
+
+    def test_init_skipped(self, init_run, application_workspace):
+        application = Application()
+        application.terraform_init("dev")
+        application.terraform_init("dev")
+        assert init_run.call_count == 1
+        application.terraform_init("dev", reinit=True)
+        assert init_run.call_count == 2
+
+    def test_init_after_change(self, init_run, application_workspace):
+        application = Application()
+        application.terraform_init("dev")
+        (application_workspace / "iac" / "modules" / "main.tf").write_text(
+            'module "bucket" {\n  source = "terraform-google-modules/cloud-storage/google"\n}\n'
+        )
+        application.terraform_init("dev")
+        assert init_run.call_count == 2
+        (application_workspace / "config" / "core" / "tfstate.yaml").write_text("tf_bucket: other-bucket\n")
+        application.terraform_init("dev")
+        assert init_run.call_count == 3
+
+
+class TestPluginCache:
+    def test_cache_shared_and_pruned(self, mocker, application_workspace):
+        cache_dir = application_workspace / "plugin-cache"
+        old_provider = cache_dir / "registry.terraform.io" / "hashicorp" / "null" / "3.0.0" / "linux_amd64"
+        new_provider = cache_dir / "registry.terraform.io" / "hashicorp" / "google" / "5.0.0" / "linux_amd64"
+
+        def run(cmd, *args, **kwargs):
+            assert kwargs["env"]["TF_PLUGIN_CACHE_DIR"] == str(cache_dir)
+            for provider_dir in [old_provider, new_provider]:
+                provider_dir.mkdir(parents=True, exist_ok=True)
+                (provider_dir / "terraform-provider").write_bytes(b"0" * 700 * 1024)
+            os.utime(old_provider, (0, 0))
+            link_dir = application_workspace / "iac" / "environments" / "dev" / ".terraform" / "providers" / \
+                "registry.terraform.io" / "hashicorp" / "google" / "5.0.0"
+            link_dir.mkdir(parents=True)
+            (link_dir / "linux_amd64").symlink_to(new_provider)
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+
+        mocker.patch("xia_framework.base.subprocess.run", side_effect=run)
+        Application().terraform_init("dev")
+        assert new_provider.exists()
+        assert not (cache_dir / "registry.terraform.io" / "hashicorp" / "null").exists()
+
+    def test_no_pruning_by_default(self, mocker, application_workspace):
+        cache_dir = application_workspace / "plugin-cache"
+        landscape_yaml = application_workspace / "config" / "landscape.yaml"
+        landscape_yaml.write_text(landscape_yaml.read_text().replace("  tf_plugin_cache_max_mb: 1\n", ""))
+        cache_dir.mkdir()
+        prune = mocker.patch("xia_framework.base.TfPluginCache.prune")
+        mocker.patch("xia_framework.base.subprocess.run", return_value=subprocess.CompletedProcess("", 0, "", ""))
+        Application().terraform_init("dev")
+        prune.assert_not_called()
+
+    def test_linked_providers_not_pruned(self, mocker, application_workspace):
+        cache_dir = application_workspace / "plugin-cache"
+        sit_provider = cache_dir / "registry.terraform.io" / "hashicorp" / "null" / "3.0.0" / "linux_amd64"
+        dev_provider = cache_dir / "registry.terraform.io" / "hashicorp" / "google" / "5.0.0" / "linux_amd64"
+        for provider_dir in [sit_provider, dev_provider]:
+            provider_dir.mkdir(parents=True)
+            (provider_dir / "terraform-provider").write_bytes(b"0" * 700 * 1024)
+        os.utime(sit_provider, (0, 0))
+        for env_name, provider_dir in [("sit", sit_provider), ("dev", dev_provider)]:
+            link_dir = application_workspace / "iac" / "environments" / env_name / ".terraform" / "providers"
+            link_dir.mkdir(parents=True)
+            (link_dir / "linux_amd64").symlink_to(provider_dir)
+        mocker.patch("xia_framework.base.subprocess.run", return_value=subprocess.CompletedProcess("", 0, "", ""))
+        Application().terraform_init("dev")
+        assert sit_provider.exists()
+
+    def test_dangling_provider_reinit(self, mocker, application_workspace):
+        run = mocker.patch("xia_framework.base.subprocess.run",
+                           return_value=subprocess.CompletedProcess("", 0, "", ""))
+        dev_dir = application_workspace / "iac" / "environments" / "dev"
+        (dev_dir / ".terraform" / "providers").mkdir(parents=True)
+        Application().terraform_init("dev")
+        Application().terraform_init("dev")
+        assert run.call_count == 1
+        (dev_dir / ".terraform" / "providers" / "linux_amd64").symlink_to(application_workspace / "removed")
+        Application().terraform_init("dev")
+        assert run.call_count == 2
@@ -0,0 +1,38 @@
+import json
+import subprocess
+from xia_framework.tracing import Tracer
+from xia_framework.tools import Cli
+from xia_framework.application import Application
+
+
+class TestTracing:
+    def test_spans_and_chrome_trace(self, tmp_path):
+        tracer = Tracer()
+        with tracer.span("prepare"):
+            with tracer.span("module-a", category="module"):
+                pass
+        tracer.traced()(lambda: None)()
+        summary = {line["name"]: line for line in tracer.get_summary()}
+        assert summary["prepare"]["count"] == 1
+        assert summary["module-a"]["category"] == "module"
+        tracer.write_chrome_trace(str(tmp_path / "trace.json"))
+        trace_events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+        assert {event["name"] for event in trace_events} == {"prepare", "module-a", "<lambda>"}
+        assert all(event["ph"] == "X" for event in trace_events)
+
+    def test_main_trace_option(self, tmp_path, monkeypatch, mocker):
+        monkeypatch.chdir(tmp_path)
+        mocker.patch("xia_framework.tracing.tracer.spans", [])
+        run = mocker.patch("xia_framework.tools.cli.subprocess.run", return_value=subprocess.CompletedProcess("", 0))
+        application = Application()
+
+        def init_config(args):
+            Cli.run("gh variable list --json=name,value", stdout=subprocess.PIPE, shell=True)
+
+        application.run_book["init-config"]["run"] = init_config
+        application.main(["--trace", "trace.json", "init-config"])
+        run.assert_called_once()
+        trace_events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+        assert [(event["cat"], event["name"]) for event in trace_events] == [
+            ("subprocess", "gh variable"), ("command", "init-config")
+        ]
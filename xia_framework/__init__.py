@@ -1,8 +1,4 @@
-from xia_framework.base import Base
-from xia_framework.cosmos import Cosmos
-from xia_framework.application import Application
-from xia_framework.realm import Realm
-from xia_framework.foundation import Foundation
+import importlib
 
 __all__ = [
     "Base",
@@ -13,3 +9,24 @@ __all__ = [
 ]
 
 __version__ = "0.0.66"
+
+# Components are only imported when used, so that the command line starts fast
+_lazy_attributes = {
+    "Base": "xia_framework.base",
+    "Cosmos": "xia_framework.cosmos",
+    "Application": "xia_framework.application",
+    "Realm": "xia_framework.realm",
+    "Foundation": "xia_framework.foundation",
+}
+
+
+def __getattr__(name: str):
+    if name not in _lazy_attributes:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    attribute = getattr(importlib.import_module(_lazy_attributes[name]), name)
+    globals()[name] = attribute
+    return attribute
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
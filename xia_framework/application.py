@@ -1,18 +1,38 @@
-import argparse
-import subprocess
-import importlib
 import os
-import yaml
 from xia_framework.base import Base
 from xia_framework.tools import CliGH
 
 
+def _run_terraform_env(app_class, init_kwargs: dict, runtime_options: dict, env_name: str, action: str,
+                       auto_approve: bool = False):
+    """Run terraform action of one environment in a worker process
+
+    Args:
+        app_class: Application class to be instantiated in the worker
+        init_kwargs: Parameters to instantiate the application
+        runtime_options: Runtime options of the application given by command line (reinit...)
+        env_name: Environment Name
+        action: "plan" or "apply"
+        auto_approve: Approve apply automatically
+
+    Returns:
+        tuple of environment name and exit status
+    """
+    application = app_class(**init_kwargs)
+    for option_name, option_value in runtime_options.items():
+        setattr(application, option_name, option_value)
+    return env_name, application.run_terraform_action(env_name, action, auto_approve)
+
+
 class Application(Base):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.run_book.update({
             "init-config": {"cli": self.cli_init_config, "run": self.cmd_init_config},
             "init-module": {"cli": self.cli_init_module, "run": self.cmd_init_module},
+            "wheelhouse": {"cli": self.cli_wheelhouse, "run": self.cmd_wheelhouse},
+            "lock": {"cli": self.cli_lock, "run": self.cmd_lock},
+            "serve": {"cli": self.cli_serve, "run": self.cmd_serve},
             "plan": {"cli": self.cli_plan, "run": self.cmd_plan},
             "apply": {"cli": self.cli_apply, "run": self.cmd_apply},
             "destroy": {"cli": self.cli_destroy, "run": self.cmd_destroy},
@@ -20,31 +40,98 @@ class Application(Base):
         })
 
     def init_config(self):
+        var_dict = CliGH.get_gh_variable_dict()
         landscape_replace_dict = {
-            "cosmos_name:": f"  cosmos_name: {CliGH.get_gh_action_var('cosmos_name')}\n",
-            "realm_name:": f"  realm_name: {CliGH.get_gh_action_var('realm_name')}\n",
-            "foundation_name:": f"  foundation_name: {CliGH.get_gh_action_var('foundation_name')}\n",
-            "application_name:": f"  application_name: {CliGH.get_gh_action_var('app_name')}\n",
+            "cosmos_name:": f"  cosmos_name: {var_dict.get('cosmos_name')}\n",
+            "realm_name:": f"  realm_name: {var_dict.get('realm_name')}\n",
+            "foundation_name:": f"  foundation_name: {var_dict.get('foundation_name')}\n",
+            "application_name:": f"  application_name: {var_dict.get('app_name')}\n",
         }
-        self._config_replace(self.landscape_yaml, landscape_replace_dict)
-        tf_bucket_name = CliGH.get_gh_action_var('tf_bucket_name')
+        patch_dict = {self.landscape_yaml: landscape_replace_dict}
+        tf_bucket_name = var_dict.get('tf_bucket_name')
         if tf_bucket_name:
             tfstate_replace_dict = {
                 "tf_bucket:": f"tf_bucket: {tf_bucket_name}\n",
             }
             tfstate_file_path = os.path.sep.join([self.config_dir, "core", "tfstate.yaml"])
-            self._config_replace(tfstate_file_path, tfstate_replace_dict)
-        gcp_project_prefix = CliGH.get_gh_action_var('gcp_project_prefix')
+            patch_dict[tfstate_file_path] = tfstate_replace_dict
+        gcp_project_prefix = var_dict.get('gcp_project_prefix')
         if gcp_project_prefix:
             gcp_replace_dict = {
                 "project_prefix:": f"project_prefix: {gcp_project_prefix}\n",
             }
             gcp_file_path = os.path.sep.join([self.config_dir, "platform", "gcp-project.yaml"])
-            self._config_replace(gcp_file_path, gcp_replace_dict)
+            patch_dict[gcp_file_path] = gcp_replace_dict
+        self._config_patch(patch_dict)
+
+    def get_env_names(self, env_name: str = None, all_envs: bool = False) -> list:
+        """Get environment list to be handled
+
+        Args:
+            env_name (str): Environment name, could be several names separated by comma
+            all_envs (bool): Take all environments defined in landscape.yaml
+
+        Returns:
+            environment name list
+        """
+        if not all_envs:
+            return env_name.split(",") if env_name else [env_name]
+        landscape_dict = self.config_store.load(self.landscape_yaml) or {}
+        env_names = list(landscape_dict.get("environments", {}) or {})
+        if not env_names:
+            raise ValueError("No environment defined in landscape.yaml")
+        return env_names
+
+    def run_terraform_action(self, env_name: str, action: str, auto_approve: bool = False) -> int:
+        """Run terraform init then plan/apply of a prepared environment
+
+        Args:
+            env_name (str): Environment name
+            action (str): "plan" or "apply"
+            auto_approve (bool): Approve apply automatically
+
+        Returns:
+            exit status
+        """
+        r = self.terraform_init(env=env_name)
+        if r.returncode != 0:
+            return r.returncode
+        if action == "apply":
+            r = self.terraform_apply(env=env_name, auto_approve=auto_approve)
+        else:
+            r = self.terraform_plan(env=env_name)
+        return r.returncode
+
+    def run_environments(self, env_names: list, action: str, auto_approve: bool = False, max_workers: int = None):
+        """Run terraform init then plan/apply of several environments in parallel
+
+        Args:
+            env_names (list): Environment name list
+            action (str): "plan" or "apply"
+            auto_approve (bool): Approve apply automatically
+            max_workers (int): Maximum number of environments handled in the same time
+
+        Returns:
+            dictionary of environment name: exit status
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        if action == "apply" and not auto_approve:
+            raise ValueError("Applying several environments in parallel needs auto approve")
+        max_workers = max_workers if max_workers else min(len(env_names), os.cpu_count() or 1)
+        init_kwargs = {"config_dir": self.config_dir}
+        runtime_options = {option_name: getattr(self, option_name) for option_name in self.RUNTIME_OPTIONS}
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_run_terraform_env, self.__class__, init_kwargs, runtime_options, env_name,
+                                       action, auto_approve)
+                       for env_name in env_names]
+            env_results = dict(future.result() for future in futures)
+        print(f"Terraform {action} results:")
+        for env_name, return_code in env_results.items():
+            print(f"  {env_name}: {'OK' if return_code == 0 else f'FAILED (exit status {return_code})'}")
+        return env_results
 
     def terraform_get_state_file_prefix(self, env_name: str = None):
-        with open(self.landscape_yaml, 'r') as file:
-            landscape_dict = yaml.safe_load(file) or {}
+        landscape_dict = self.config_store.load(self.landscape_yaml) or {}
         environment_settings = landscape_dict["environments"]
         if env_name not in environment_settings:
             raise ValueError(f"Environment {env_name} not defined in landscape.yaml")
@@ -64,16 +151,37 @@ class Application(Base):
         sub_parser.add_argument('-n', '--module-uri', type=str,
                                 help='Module uri to be added in format: <package_name>@<version>/<module_name>')
 
+    @classmethod
+    def cli_wheelhouse(cls, subparsers):
+        sub_parser = subparsers.add_parser('wheelhouse',
+                                           help='Build wheels of all needed packages for offline installs')
+        sub_parser.add_argument('-w', '--wheel-dir', type=str,
+                                help='Wheel directory, find_links of default repository by default')
+
+    @classmethod
+    def cli_lock(cls, subparsers):
+        subparsers.add_parser('lock', help='Resolve needed packages into packages.lock with versions and hashes')
+
+    @classmethod
+    def cli_serve(cls, subparsers):
+        subparsers.add_parser('serve', help='Keep a warm instance serving commands run with --daemon')
+
     @classmethod
     def cli_plan(cls, subparsers):
         sub_parser = subparsers.add_parser('plan', help=f'Prepare {cls.__name__} Deploy time objects')
-        sub_parser.add_argument('-e', '--env_name', type=str, help='Environment Name')
+        sub_parser.add_argument('-e', '--env_name', type=str,
+                                help='Environment Name, several environments separated by comma will be planned')
+        sub_parser.add_argument('--all-envs', action='store_true', help='Plan all environments of landscape.yaml')
+        sub_parser.add_argument('--max-workers', type=int, help='Maximum environments planned in parallel')
 
     @classmethod
     def cli_apply(cls, subparsers):
         sub_parser = subparsers.add_parser('apply', help=f'Prepare {cls.__name__} Deploy time objects')
-        sub_parser.add_argument('-e', '--env_name', type=str, help='Environment Name')
+        sub_parser.add_argument('-e', '--env_name', type=str,
+                                help='Environment Name, several environments separated by comma will be applied')
         sub_parser.add_argument('-y', '--auto-approve', type=str, help='Approve apply automatically')
+        sub_parser.add_argument('--all-envs', action='store_true', help='Apply all environments of landscape.yaml')
+        sub_parser.add_argument('--max-workers', type=int, help='Maximum environments applied in parallel')
 
     @classmethod
     def cli_destroy(cls, subparsers):
@@ -93,13 +201,47 @@ class Application(Base):
     def cmd_init_module(self, args):
         return self.init_module(module_uri=args.module_uri)
 
+    def cmd_wheelhouse(self, args):
+        return self.build_wheelhouse(wheel_dir=args.wheel_dir)
+
+    def cmd_lock(self, args):
+        return self.lock_requirements()
+
+    def cmd_serve(self, args):
+        from xia_framework.daemon import Daemon
+        Daemon(self).serve()
+
     def cmd_plan(self, args):
-        return self.prepare(env_name=args.env_name, skip_terraform=True)
+        env_names = self.get_env_names(env_name=args.env_name, all_envs=args.all_envs)
+        if env_names == [None]:
+            return self.prepare(skip_terraform=True)  # No environment to plan, only prepare the base one
+        if len(env_names) == 1:
+            self.prepare(env_name=env_names[0], skip_terraform=True)
+            return_code = self.run_terraform_action(env_names[0], "plan")
+            if return_code != 0:
+                raise SystemExit(return_code)
+            return
+        self.prepare_environments(env_names)
+        env_results = self.run_environments(env_names, "plan", max_workers=args.max_workers)
+        if any(env_results.values()):
+            raise SystemExit(1)
 
     def cmd_apply(self, args):
-        self.prepare(env_name=args.env_name, skip_terraform=True)
-        self.terraform_init(env=args.env_name)
-        self.terraform_apply(env=args.env_name, auto_approve=args.auto_approve)
+        env_names = self.get_env_names(env_name=args.env_name, all_envs=args.all_envs)
+        if len(env_names) == 1:
+            self.prepare(env_name=env_names[0], skip_terraform=True)
+            return_code = self.run_terraform_action(env_names[0], "apply", auto_approve=args.auto_approve)
+            if return_code != 0:
+                raise SystemExit(return_code)
+            return
+        if not args.auto_approve:
+            print("Applying several environments in parallel needs auto approve (-y)")
+            raise SystemExit(1)
+        self.prepare_environments(env_names)
+        env_results = self.run_environments(env_names, "apply", auto_approve=args.auto_approve,
+                                            max_workers=args.max_workers)
+        if any(env_results.values()):
+            raise SystemExit(1)
 
     def cmd_destroy(self, args):
         self.prepare(env_name=args.env_name, skip_terraform=True)
@@ -107,9 +249,7 @@ class Application(Base):
         self.terraform_destroy(env=args.env_name, auto_approve=args.auto_approve)
 
     def cmd_unlock(self, args):
-        self.prepare(env_name=args.env_name, skip_terraform=True)
-        self.terraform_init(env=args.env_name)
-        self.terraform_unlock(env=args.env_name)
+        self.unlock_environment(env=args.env_name)
 
 
 if __name__ == "__main__":
@@ -1,26 +1,38 @@
 import os
-import argparse
+import sys
 import subprocess
-import yaml
-from ruamel.yaml import YAML
+import sysconfig
 import re
 import shutil
 import importlib
+import hashlib
+import json
+from xia_framework.config_store import ConfigStore
+from xia_framework.config_patch import ConfigPatcher
+from xia_framework.tools import Cli, GcsTfLock, LocalTfLock, TfPluginCache
+from xia_framework.tracing import tracer
 
 
 class Base:
     BASE_ENV = "base"
+    ENV_SYNC_MANIFEST = ".xia_sync.json"
+    PLAN_FILE = "tfplan"
+    PLAN_KEY_FILE = "tfplan.key"
+    INIT_FINGERPRINT_FILE = "xia_init.sha256"  # Saved in .terraform directory, so it goes away with it
+    ENV_SYNC_EXCLUDES = [".terraform", ENV_SYNC_MANIFEST, PLAN_FILE, PLAN_KEY_FILE]
+    tf_lock_dict = {"gcs": GcsTfLock, "local": LocalTfLock}  # tf_backend of tfstate.yaml => lock inspector
+    config_store = ConfigStore()  # Shared by all instances of the process
+    RUNTIME_OPTIONS = ["force_install", "skip_install", "module_workers", "force_render", "reinit"]  # Set by main
 
     def __init__(self, config_dir: str = "config", **kwargs):
         self.run_book = {}
-        self.yaml = YAML()
-        yaml.preserve_quotes = True
         self.config_dir = config_dir
         self.module_dir = os.path.sep.join(["iac", "modules"])
         self.env_dir = os.path.sep.join(["iac", "environments"])
         self.landscape_yaml = os.path.sep.join([self.config_dir, "landscape.yaml"])
         self.module_yaml = os.path.sep.join([self.config_dir, "modules.yaml"])
         self.package_yaml = os.path.sep.join([self.config_dir, "packages.yaml"])
+        self.package_lock = os.path.sep.join([self.config_dir, "packages.lock"])
 
         self.tfstate_yaml = os.path.sep.join([self.config_dir, "core", "tfstate.yaml"])
 
@@ -28,6 +40,24 @@ class Base:
         self.requirements_txt = os.path.sep.join([self.config_dir, "requirements.txt"])
         self.package_pattern = re.compile(r'^[a-zA-Z0-9_-]+$')
 
+        # Local states
+        self.state_dir = ".xia"
+        self.requirements_fingerprint = os.path.sep.join([self.state_dir, "requirements.sha256"])
+        self.render_cache_json = os.path.sep.join([self.module_dir, ".render_cache.json"])
+        self.config_store.cache_dir = os.path.sep.join([self.state_dir, "config_cache"])
+
+        # Runtime options
+        self.force_install = False
+        self.skip_install = False
+        self.module_workers = None
+        self.force_render = False
+        self.reinit = False
+
+    @property
+    def yaml(self):
+        """ruamel round-trip parser, shared with the config store"""
+        return self.config_store.yaml
+
     @classmethod
     def _parse_module_uri(cls, module_uri: str):
         pattern_1 = r'^[a-zA-Z0-9_-]+@[a-zA-Z0-9\.]+/[a-zA-Z0-9_-]+$'
@@ -48,30 +78,28 @@ class Base:
         Args:
             file_path: file path of the file to be replaced
             replace_dict: replacement dictionary (example {"key:", "key: value"})
+
+        Returns:
+            Report as {"matched": [key, ...], "unmatched": [key, ...]}
         """
-        if not os.path.isfile(file_path):
-            print(f"File {file_path} doesn't exist, skip")
-            return
-        with open(file_path) as config_file:
-            lines = config_file.readlines()
-        new_lines = []
-        for line in lines:
-            stripped_line = line.strip()
-            if not stripped_line.startswith("#"):
-                new_lines.append(line)
-                continue
-            stripped_line = stripped_line[1:].strip()
-            key_word_found = False
-            for key_word, new_content in replace_dict.items():
-                if stripped_line.startswith(key_word):
-                    new_lines.append(new_content)
-                    key_word_found = True
-                    break
-            if not key_word_found:
-                new_lines.append(line)
-        with open(file_path, "w") as config_file:
-            config_file.writelines(new_lines)
+        return cls._config_patch({file_path: replace_dict})[file_path]
+
+    @classmethod
+    def _config_patch(cls, patch_dict: dict) -> dict:
+        """Configuration line replace of several files, each file is read once and replaced atomically
+
+        Args:
+            patch_dict: {file_path: replacement dictionary}
+
+        Returns:
+            {file_path: {"matched": [key, ...], "unmatched": [key, ...]}}
+        """
+        patch_report = ConfigPatcher.patch(patch_dict)
+        for file_path in patch_dict:
+            cls.config_store.invalidate(file_path)
+        return patch_report
 
+    @tracer.traced()
     def init_module(self, module_uri: str):
         """initialize a module
 
@@ -80,8 +108,7 @@ class Base:
         """
         package_name, version, module_name = self._parse_module_uri(module_uri=module_uri)
         package_address = self.get_package_address(package_name=package_name, package_version=version)
-        with open(self.module_yaml, 'r') as module_file:
-            module_dict = self.yaml.load(module_file) or {}
+        module_dict = self.config_store.load_rt(self.module_yaml) or {}
         new_module = True if module_name not in module_dict else False
         module_dict[module_name] = {"package": package_name, "events": {"deploy": None}}
         module_config = module_dict[module_name]
@@ -89,7 +116,7 @@ class Base:
             module_obj = importlib.import_module(module_config["package"].replace("-", "_"))
         except (ImportError, ModuleNotFoundError):
             # Installation of package if module is not found
-            subprocess.run(['pip', 'install', package_address], check=True)
+            Cli.run(['pip', 'install', package_address, *self.get_pip_options()], check=True)
             module_obj = importlib.import_module(module_config["package"].replace("-", "_"))
         module_class_name = getattr(module_obj, "modules", {}).get(module_name)
         module_class = getattr(module_obj, module_class_name)
@@ -98,18 +125,16 @@ class Base:
         module_instance.initialize(**init_config)
         if new_module:
             # All goes well, should be safe to save the modified module configuration
-            with open(self.package_yaml, 'r') as package_file:
-                package_dict = self.yaml.load(package_file) or {}
+            package_dict = self.config_store.load_rt(self.package_yaml) or {}
             if package_name not in package_dict:
                 if version:
                     package_dict["packages"][package_name] = {"version": version}
                 else:
                     package_dict["packages"][package_name] = None
-                with open(self.package_yaml, 'w') as package_file:
-                    self.yaml.dump(package_dict, package_file)
-            with open(self.module_yaml, 'w') as module_file:
-                self.yaml.dump(module_dict, module_file)
+                self.config_store.save_rt(self.package_yaml, package_dict)
+            self.config_store.save_rt(self.module_yaml, module_dict)
 
+    @tracer.traced()
     def activate_module(self, module_uri: str, depends_on: list = None):
         """activate a module
 
@@ -119,8 +144,7 @@ class Base:
         """
         package_name, version, module_name = self._parse_module_uri(module_uri=module_uri)
         package_address = self.get_package_address(package_name=package_name, package_version=version)
-        with open(self.module_yaml, 'r') as module_file:
-            module_dict = self.yaml.load(module_file) or {}
+        module_dict = self.config_store.load_rt(self.module_yaml) or {}
         new_module = True if module_name not in module_dict else False
         module_dict[module_name] = {"package": package_name, "events": {"activate": None}}
         module_config = module_dict[module_name]
@@ -128,7 +152,7 @@ class Base:
             module_obj = importlib.import_module(module_config["package"].replace("-", "_"))
         except (ImportError, ModuleNotFoundError):
             # Installation of package if module is not found
-            subprocess.run(['pip', 'install', package_address], check=True)
+            Cli.run(['pip', 'install', package_address, *self.get_pip_options()], check=True)
             module_obj = importlib.import_module(module_config["package"].replace("-", "_"))
         module_class_name = getattr(module_obj, "modules", {}).get(module_name)
         module_class = getattr(module_obj, module_class_name)
@@ -137,17 +161,14 @@ class Base:
             module_config["depends_on"] = depends_on if depends_on else module_instance.activate_depends
         if new_module:
             # All goes well, should be safe to save the modified module configuration
-            with open(self.package_yaml, 'r') as package_file:
-                package_dict = self.yaml.load(package_file) or {}
+            package_dict = self.config_store.load_rt(self.package_yaml) or {}
             if package_name not in package_dict:
                 if version:
                     package_dict["packages"][package_name] = {"version": version}
                 else:
                     package_dict["packages"][package_name] = None
-                with open(self.package_yaml, 'w') as package_file:
-                    self.yaml.dump(package_dict, package_file)
-            with open(self.module_yaml, 'w') as module_file:
-                self.yaml.dump(module_dict, module_file)
+                self.config_store.save_rt(self.package_yaml, package_dict)
+            self.config_store.save_rt(self.module_yaml, module_dict)
 
     @classmethod
     def get_package_address(cls, package_name: str, package_version: str = None, git_https_url: str = None,
@@ -175,8 +196,7 @@ class Base:
             ignore_existed (bool): Do not check local packages
 
         """
-        with open(self.package_yaml, 'r') as file:
-            package_config = yaml.safe_load(file) or {}
+        package_config = self.config_store.load(self.package_yaml) or {}
 
         repo_dict = package_config.get("repositories", {})
         package_dict = package_config.get("packages", {})
@@ -193,6 +213,7 @@ class Base:
                 package_addresses[package_name] = package_address
         return package_addresses
 
+    @tracer.traced()
     def update_requirements(self):
         needed_packages = self.get_needed_packages()
 
@@ -201,18 +222,263 @@ class Base:
             print(f"Requirement File Generated Dynamically: \n{requirements_content}")
             file.write(requirements_content)
 
-    def install_requirements(self):
+    @classmethod
+    def get_requirements_fingerprint(cls, needed_packages: dict, pip_index_url: str) -> str:
+        """Fingerprint of the resolved package addresses and the package index
+
+        Args:
+            needed_packages (dict): package name => package address
+            pip_index_url (str): Package index url (or pip package source options)
+
+        Returns:
+            Hexadecimal sha256 digest
+        """
+        content = "\n".join([pip_index_url] + [f"{k}={v}" for k, v in sorted(needed_packages.items())])
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    @classmethod
+    def is_package_installed(cls, package_name: str, package_address: str) -> bool:
+        """Check if installed distribution satisfies the package address
+
+        Args:
+            package_name (str): Package name
+            package_address (str): Package address as generated by get_package_address
+
+        Returns:
+            True if the package is installed with the expected version
+        """
+        import importlib.metadata
+        try:
+            installed_version = importlib.metadata.version(package_name)
+        except importlib.metadata.PackageNotFoundError:
+            return False
+        if "==" in package_address and not package_address.startswith("git+"):
+            return installed_version == package_address.split("==", 1)[1].strip()
+        return True
+
+    def get_missing_packages(self, needed_packages: dict, fingerprint: str) -> dict:
+        """Get packages which are not satisfied by the installed distributions
+
+        Git based packages couldn't be version checked, so they are considered as missing once the fingerprint changes
+
+        Args:
+            needed_packages (dict): package name => package address
+            fingerprint (str): Fingerprint of current requirements
+
+        Returns:
+            package name => package address of packages to be installed
+        """
+        saved_fingerprint = None
+        if os.path.exists(self.requirements_fingerprint):
+            with open(self.requirements_fingerprint) as file:
+                saved_fingerprint = file.read().strip()
+        missing_packages = {}
+        for package_name, package_address in needed_packages.items():
+            if package_address.startswith("git+") and saved_fingerprint != fingerprint:
+                missing_packages[package_name] = package_address
+            elif not self.is_package_installed(package_name, package_address):
+                missing_packages[package_name] = package_address
+        return missing_packages
+
+    def save_requirements_fingerprint(self, fingerprint: str):
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(self.requirements_fingerprint, 'w') as file:
+            file.write(fingerprint)
+
+    def get_pip_index_url(self) -> str:
+        landscape_dict = self.config_store.load(self.landscape_yaml) or {}
+        return (landscape_dict.get("settings", {}) or {}).get("pip_index_url", "https://pypi.org/simple")
+
+    def get_pip_options(self) -> list:
+        """Get pip package source options
+
+        Repositories of packages.yaml could define a local wheel directory with "find_links". When one of them sets
+        "no_index", pip only installs from the local directories.
+
+        Returns:
+            pip command line options
+        """
+        package_config = self.config_store.load(self.package_yaml) or {}
+        repo_dict = package_config.get("repositories", {}) or {}
+        pip_options, no_index = [], False
+        for repository_cfg in repo_dict.values():
+            repository_cfg = repository_cfg or {}
+            find_links = repository_cfg.get("find_links", None)
+            if find_links and f"--find-links={find_links}" not in pip_options:
+                pip_options.append(f"--find-links={find_links}")
+            no_index = no_index or bool(repository_cfg.get("no_index", False))
+        pip_options.append("--no-index" if no_index else f"--index-url={self.get_pip_index_url()}")
+        return pip_options
+
+    def get_wheelhouse_dir(self) -> str:
+        package_config = self.config_store.load(self.package_yaml) or {}
+        repository_cfg = (package_config.get("repositories", {}) or {}).get("default", {}) or {}
+        return repository_cfg.get("find_links", None) or "wheelhouse"
+
+    @tracer.traced()
+    def build_wheelhouse(self, wheel_dir: str = None):
+        """Build or download wheels of all needed packages and their dependencies
+
+        Args:
+            wheel_dir (str): Wheel directory, find_links of default repository or "wheelhouse" if not provided
+        """
+        wheel_dir = wheel_dir if wheel_dir else self.get_wheelhouse_dir()
+        needed_packages = self.get_needed_packages()
+        if not needed_packages:
+            print("No package needed")
+            return
+        os.makedirs(wheel_dir, exist_ok=True)
+        Cli.run(['pip', 'wheel', '-w', wheel_dir, *needed_packages.values(),
+                 f"--index-url={self.get_pip_index_url()}"], check=True)
+        print(f"Wheels of {len(needed_packages)} package(s) and their dependencies saved in {wheel_dir}")
+
+    @tracer.traced()
+    def install_requirements(self, force: bool = False):
+        """Install needed packages
+
+        Args:
+            force (bool): Run pip install of all requirements even if they are already satisfied
+        """
+        if self.skip_install:
+            print("Package installation skipped")
+            return
+        pip_options = self.get_pip_options()
+        if os.path.exists(self.package_lock):
+            if self.get_lock_fingerprint() != self.get_package_yaml_fingerprint():
+                print(f"{self.package_lock} is outdated, run lock command to update it")
+            elif self.get_lock_platform() != self.get_platform_tag():
+                print(f"{self.package_lock} is locked for {self.get_lock_platform()}, not {self.get_platform_tag()}, "
+                      f"installing from {self.package_yaml}")
+            else:
+                return self.install_locked_requirements(pip_options, force=force or self.force_install)
+        if not (force or self.force_install):
+            needed_packages = self.get_needed_packages()
+            fingerprint = self.get_requirements_fingerprint(needed_packages, " ".join(pip_options))
+            missing_packages = self.get_missing_packages(needed_packages, fingerprint)
+            if missing_packages:
+                Cli.run(['pip', 'install', *missing_packages.values(), *pip_options], check=True)
+            else:
+                print("All required packages are already installed")
+            self.save_requirements_fingerprint(fingerprint)
+            return
+
         requirements_existed = os.path.exists(self.requirements_txt)
         if not requirements_existed:
             self.update_requirements()
-        with open(self.landscape_yaml, 'r') as file:
-            landscape_dict = yaml.safe_load(file) or {}
-        pip_index_url = landscape_dict.get("settings", {}).get("pip_index_url", "https://pypi.org/simple")
-        subprocess.run(['pip', 'install', '-r', self.requirements_txt,
-                        f"--index-url={pip_index_url}"], check=True)
+        Cli.run(['pip', 'install', '-r', self.requirements_txt, *pip_options], check=True)
         if not requirements_existed:
             os.remove(self.requirements_txt)
 
+    def get_package_yaml_fingerprint(self) -> str:
+        with open(self.package_yaml, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+    def _get_lock_header(self, header_prefix: str):
+        with open(self.package_lock) as file:
+            for line in file:
+                if line.startswith(header_prefix):
+                    return line[len(header_prefix):].strip()
+
+    def get_lock_fingerprint(self):
+        """Get packages.yaml fingerprint saved in the lock file header"""
+        return self._get_lock_header("# packages.yaml sha256:")
+
+    def get_lock_platform(self):
+        """Get platform tag saved in the lock file header"""
+        return self._get_lock_header("# platform:")
+
+    @classmethod
+    def get_platform_tag(cls) -> str:
+        """Interpreter and platform the packages are resolved for, e.g. cpython3.11-linux-x86_64
+
+        Only the hash of the artifact chosen for this platform is locked, so the lock file is only valid for it
+        """
+        return f"{sys.implementation.name}{sys.version_info.major}.{sys.version_info.minor}-{sysconfig.get_platform()}"
+
+    @classmethod
+    def get_lock_lines(cls, pip_report: dict) -> list:
+        """Get lock file lines from a pip installation report
+
+        Args:
+            pip_report (dict): Report generated by pip install --report
+
+        Returns:
+            list of requirement lines, pinned with the hash of the artifact selected for the current platform. Direct
+            references (git, local directories) have no hash
+        """
+        lock_lines = []
+        for install_item in pip_report.get("install", []):
+            name, version = install_item["metadata"]["name"], install_item["metadata"]["version"]
+            download_info = install_item.get("download_info", {})
+            url = download_info.get("url", "")
+            if "vcs_info" in download_info:
+                vcs_info = download_info["vcs_info"]
+                lock_lines.append(f"{name} @ {vcs_info['vcs']}+{url}@{vcs_info['commit_id']}")
+            elif "dir_info" in download_info:
+                lock_lines.append(f"{name} @ {url}")
+            else:
+                archive_info = download_info.get("archive_info", {})
+                sha256 = archive_info.get("hashes", {}).get("sha256", None)
+                if not sha256 and archive_info.get("hash", "").startswith("sha256="):
+                    sha256 = archive_info["hash"].split("=", 1)[1]
+                if not sha256 and url.startswith("file://"):
+                    with open(url[len("file://"):], 'rb') as file:
+                        sha256 = hashlib.sha256(file.read()).hexdigest()
+                lock_lines.append(f"{name}=={version} --hash=sha256:{sha256}" if sha256 else f"{name} @ {url}")
+        return sorted(lock_lines, key=str.lower)
+
+    @tracer.traced()
+    def lock_requirements(self):
+        """Resolve all needed packages with their dependencies and save exact versions and hashes in the lock file"""
+        needed_packages = self.get_needed_packages()
+        os.makedirs(self.state_dir, exist_ok=True)
+        report_file = os.path.sep.join([self.state_dir, "pip_report.json"])
+        Cli.run(['pip', 'install', '--dry-run', '--ignore-installed', '--quiet', '--report', report_file,
+                 *needed_packages.values(), *self.get_pip_options()], check=True)
+        with open(report_file) as file:
+            lock_lines = self.get_lock_lines(json.load(file))
+        os.remove(report_file)
+        with open(self.package_lock, 'w') as file:
+            file.write("# Generated by lock command, do not edit\n")
+            file.write(f"# packages.yaml sha256:{self.get_package_yaml_fingerprint()}\n")
+            file.write(f"# platform:{self.get_platform_tag()}\n")
+            file.write("".join(line + "\n" for line in lock_lines))
+        print(f"{len(lock_lines)} package(s) locked in {self.package_lock}")
+
+    def install_locked_requirements(self, pip_options: list, force: bool = False):
+        """Install packages from lock file without dependency resolution
+
+        Args:
+            pip_options (list): pip package source options
+            force (bool): Install even if the lock file is already installed
+        """
+        with open(self.package_lock, 'rb') as file:
+            lock_content = file.read()
+        fingerprint = hashlib.sha256(lock_content + " ".join(pip_options).encode()).hexdigest()
+        saved_fingerprint = None
+        if os.path.exists(self.requirements_fingerprint):
+            with open(self.requirements_fingerprint) as file:
+                saved_fingerprint = file.read().strip()
+        if saved_fingerprint == fingerprint and not force:
+            print("All locked packages are already installed")
+            return
+        lock_lines = [line.strip() for line in lock_content.decode().splitlines()
+                      if line.strip() and not line.startswith("#")]
+        hashed_lines = [line for line in lock_lines if "--hash=" in line]
+        direct_lines = [line for line in lock_lines if "--hash=" not in line]
+        if hashed_lines:
+            os.makedirs(self.state_dir, exist_ok=True)
+            hashed_requirements = os.path.sep.join([self.state_dir, "requirements.lock.txt"])
+            with open(hashed_requirements, 'w') as file:
+                file.write("".join(line + "\n" for line in hashed_lines))
+            Cli.run(['pip', 'install', '--no-deps', '--require-hashes', '-r', hashed_requirements, *pip_options],
+                    check=True)
+        if direct_lines:
+            # Hash checking is not possible for git or local directory packages
+            Cli.run(['pip', 'install', '--no-deps', *direct_lines, *pip_options], check=True)
+        self.save_requirements_fingerprint(fingerprint)
+
+    @tracer.traced()
     def prepare(self, env_name: str = None, skip_terraform: bool = False):
         env_name = env_name if env_name else self.BASE_ENV
         self.update_requirements()
@@ -223,95 +489,581 @@ class Base:
             self.terraform_init(env_name)
             self.terraform_apply(env_name)
 
+    def prepare_environments(self, env_names: list):
+        """Prepare several environments with a single requirement installation and module loading
+
+        Args:
+            env_names (list): Environment name list
+        """
+        self.prepare(env_name=env_names[0], skip_terraform=True)
+        for env_name in env_names[1:]:
+            self.enable_environments(env_name if env_name else self.BASE_ENV)
+
     def terraform_get_state_file_prefix(self, env_name: str = None):
         raise NotImplementedError
 
-    def terraform_init(self, env: str):
-        with open(self.tfstate_yaml, 'r') as file:
-            tfstate_dict = yaml.safe_load(file) or {}
+    def terraform_get_plugin_cache(self):
+        """Get shared provider plugin cache settings from landscape.yaml
+
+        tf_plugin_cache_dir: cache directory, default to ~/.terraform.d/plugin-cache, empty value to disable the cache
+        tf_plugin_cache_max_mb: cache size limit, least recently used providers are removed above it, default to 0 for
+            no limit. Only set it for a cache used by this repository alone: providers linked from other checkouts or
+            terraform projects sharing the cache are not known and could be removed
+
+        Returns:
+            tuple of cache directory (None if disabled) and cache size limit in MB
+        """
+        landscape_dict = self.config_store.load(self.landscape_yaml) or {}
+        settings = landscape_dict.get("settings", {}) or {}
+        cache_dir = settings.get("tf_plugin_cache_dir", os.path.join("~", ".terraform.d", "plugin-cache"))
+        cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        return cache_dir, int(settings.get("tf_plugin_cache_max_mb", 0) or 0)
+
+    def terraform_get_env(self):
+        """Environment variables of terraform subprocesses
+
+        Returns:
+            Environment variables, None to inherit the current ones
+        """
+        plugin_cache_dir, _ = self.terraform_get_plugin_cache()
+        return TfPluginCache.get_env(plugin_cache_dir) if plugin_cache_dir else None
+
+    def terraform_get_backend_config(self, env: str) -> dict:
+        tfstate_dict = self.config_store.load(self.tfstate_yaml) or {}
         bucket_name = tfstate_dict.get("tf_bucket")
         # bucket_name = current_settings["realm_name"] + "_" + current_settings["foundation_name"]
+        return {"bucket": bucket_name, "prefix": self.terraform_get_state_file_prefix(env)}
+
+    def terraform_get_init_fingerprint(self, env: str) -> str:
+        """Fingerprint of everything terraform init depends on
+
+        Backend configuration, dependency lock file, module and provider sources / versions
+
+        Args:
+            env (str): Environment name
+
+        Returns:
+            Hexadecimal sha256 digest
+        """
+        init_hash = hashlib.sha256()
+        init_hash.update(json.dumps(self.terraform_get_backend_config(env), sort_keys=True).encode())
+        lock_file_path = os.path.join(self.env_dir, env, ".terraform.lock.hcl")
+        if os.path.exists(lock_file_path):
+            init_hash.update(self._get_file_hash(lock_file_path).encode())
+        source_pattern = re.compile(r'^\s*(source|version)\s*=\s*"([^"]*)"', re.MULTILINE)
+        for source_dir in [os.path.join(self.env_dir, env), self.module_dir]:
+            for root, dirs, files in os.walk(source_dir):
+                dirs[:] = sorted(d for d in dirs if d != ".terraform")
+                for file_name in sorted(f for f in files if f.endswith(".tf")):
+                    file_path = os.path.join(root, file_name)
+                    with open(file_path) as tf_file:
+                        sources = source_pattern.findall(tf_file.read())
+                    init_hash.update(json.dumps([os.path.relpath(file_path, source_dir), sources]).encode())
+        return init_hash.hexdigest()
+
+    @tracer.traced()
+    def terraform_init(self, env: str, reinit: bool = False):
+        """Terraform init, skipped if nothing has changed since the last successful init
+
+        Args:
+            env (str): Environment name
+            reinit (bool): Always run terraform init
+        """
+        backend_config = self.terraform_get_backend_config(env)
         tf_init_cmd = (f'terraform -chdir=iac/environments/{env} init '
-                       f'-backend-config="bucket={bucket_name}" '
-                       f'-backend-config="prefix={self.terraform_get_state_file_prefix(env)}"')
-        return subprocess.run(tf_init_cmd, shell=True)
+                       f'-backend-config="bucket={backend_config["bucket"]}" '
+                       f'-backend-config="prefix={backend_config["prefix"]}"')
+        fingerprint_path = os.path.join(self.env_dir, env, ".terraform", self.INIT_FINGERPRINT_FILE)
+        if not (reinit or self.reinit) and os.path.exists(fingerprint_path):
+            with open(fingerprint_path) as file:
+                if file.read().strip() == self.terraform_get_init_fingerprint(env) and \
+                        TfPluginCache.is_resolved(os.path.join(self.env_dir, env)):
+                    print(f"Terraform of environment {env} is already initialized")
+                    return subprocess.CompletedProcess(tf_init_cmd, 0)
+        plugin_cache_dir, plugin_cache_max_mb = self.terraform_get_plugin_cache()
+        if plugin_cache_dir:
+            with TfPluginCache.lock(plugin_cache_dir):
+                r = Cli.run(tf_init_cmd, shell=True, env=self.terraform_get_env())
+                TfPluginCache.touch_used(os.path.join(self.env_dir, env), plugin_cache_dir)
+                if plugin_cache_max_mb:
+                    # Provider builds linked from other environments are still needed by them
+                    env_dirs = [os.path.join(self.env_dir, env_name) for env_name in os.listdir(self.env_dir)]
+                    keep_paths = TfPluginCache.get_used_paths(env_dirs, plugin_cache_dir)
+                    TfPluginCache.prune(plugin_cache_dir, plugin_cache_max_mb, keep_paths=keep_paths)
+        else:
+            r = Cli.run(tf_init_cmd, shell=True, env=self.terraform_get_env())
+        if r.returncode == 0 and os.path.isdir(os.path.dirname(fingerprint_path)):
+            with open(fingerprint_path, 'w') as file:
+                file.write(self.terraform_get_init_fingerprint(env))
+        return r
+
+    @classmethod
+    def _get_dir_hash(cls, dir_path: str, excludes: list = None) -> str:
+        """Hash of all file paths and contents of a directory"""
+        excludes = excludes or []
+        dir_hash = hashlib.sha256()
+        for root, dirs, files in os.walk(dir_path):
+            dirs[:] = sorted(d for d in dirs if d not in excludes)
+            for file_name in sorted(f for f in files if f not in excludes):
+                file_path = os.path.join(root, file_name)
+                dir_hash.update(os.path.relpath(file_path, dir_path).encode())
+                dir_hash.update(cls._get_file_hash(file_path).encode())
+        return dir_hash.hexdigest()
+
+    def terraform_get_plan_key(self, env: str) -> str:
+        """Key of a saved plan: environment directory, rendered modules and backend configuration
+
+        Args:
+            env (str): Environment name
 
+        Returns:
+            Hexadecimal sha256 digest
+        """
+        plan_hash = hashlib.sha256()
+        plan_hash.update(self._get_dir_hash(os.path.join(self.env_dir, env), self.ENV_SYNC_EXCLUDES).encode())
+        plan_hash.update(self._get_dir_hash(self.module_dir, [".render_cache.json"]).encode())
+        plan_hash.update(json.dumps(self.terraform_get_backend_config(env), sort_keys=True).encode())
+        return plan_hash.hexdigest()
+
+    @tracer.traced()
     def terraform_apply(self, env: str, auto_approve: bool = False):
+        """Terraform apply, using the saved plan of terraform_plan if nothing has changed since planning
+
+        A saved plan is applied by terraform without confirmation, so it is only used when apply is approved.
+
+        Args:
+            env (str): Environment name
+            auto_approve (bool): Approve apply automatically
+        """
+        plan_path = os.path.join(self.env_dir, env, self.PLAN_FILE)
+        plan_key_path = os.path.join(self.env_dir, env, self.PLAN_KEY_FILE)
+        if auto_approve and os.path.exists(plan_path) and os.path.exists(plan_key_path):
+            with open(plan_key_path) as file:
+                saved_plan_key = file.read().strip()
+            os.remove(plan_key_path)  # A saved plan could only be applied once
+            if saved_plan_key == self.terraform_get_plan_key(env):
+                print(f"Applying saved plan of environment {env}")
+                tf_apply_cmd = f'terraform -chdir=iac/environments/{env} apply {self.PLAN_FILE}'
+                r = Cli.run(tf_apply_cmd, shell=True, stderr=subprocess.PIPE, text=True,
+                            env=self.terraform_get_env())
+                os.remove(plan_path)
+                if r.stderr:
+                    print(r.stderr, end="", file=sys.stderr)
+                if "Saved plan is stale" not in (r.stderr or ""):
+                    return r
+                print(f"Saved plan of environment {env} is stale, applying without it")
+            else:
+                print(f"Saved plan of environment {env} is outdated, planning again")
         auto_approve_cmd = "--auto-approve " if auto_approve else ""
         tf_apply_cmd = f'terraform {auto_approve_cmd} -chdir=iac/environments/{env} apply'
-        return subprocess.run(tf_apply_cmd, shell=True)
+        return Cli.run(tf_apply_cmd, shell=True, env=self.terraform_get_env())
 
+    @tracer.traced()
     def terraform_plan(self, env: str):
-        tf_plan_cmd = f'terraform -chdir=iac/environments/{env} plan'
-        return subprocess.run(tf_plan_cmd, shell=True)
+        """Terraform plan, the plan is saved to be reused by terraform_apply
+
+        Args:
+            env (str): Environment name
+        """
+        plan_key_path = os.path.join(self.env_dir, env, self.PLAN_KEY_FILE)
+        if os.path.exists(plan_key_path):
+            os.remove(plan_key_path)
+        plan_key = self.terraform_get_plan_key(env)
+        tf_plan_cmd = f'terraform -chdir=iac/environments/{env} plan -out={self.PLAN_FILE}'
+        r = Cli.run(tf_plan_cmd, shell=True, env=self.terraform_get_env())
+        if r.returncode == 0:
+            with open(plan_key_path, 'w') as file:
+                file.write(plan_key)
+        return r
 
+    @tracer.traced()
     def terraform_destroy(self, env: str, auto_approve: bool = False):
         auto_approve_cmd = "--auto-approve " if auto_approve else ""
         tf_destroy_cmd = f'terraform {auto_approve_cmd} -chdir=iac/environments/{env} destroy'
-        return subprocess.run(tf_destroy_cmd, shell=True)
+        return Cli.run(tf_destroy_cmd, shell=True, env=self.terraform_get_env())
+
+    def terraform_get_lock_info(self, env: str):
+        """Get lock information by reading the lock object of the backend, without running terraform
+
+        Args:
+            env (str): Environment name
+
+        Returns:
+            dictionary with id, holder, operation, created and age (in seconds), None if there is no lock
+        """
+        tf_backend = self.terraform_get_backend(env)
+        if tf_backend not in self.tf_lock_dict:
+            raise ValueError(f"Lock of terraform backend {tf_backend} could only be inspected by terraform")
+        tf_lock = self.tf_lock_dict[tf_backend]
+        backend_config = self.terraform_get_backend_config(env)
+        return tf_lock.get_lock_info(backend_config["bucket"], backend_config["prefix"])
+
+    def terraform_get_backend(self, env: str) -> str:
+        tfstate_dict = self.config_store.load(self.tfstate_yaml) or {}
+        return tfstate_dict.get("tf_backend", "gcs")
 
     def terraform_get_lock_id(self, env: str):
+        if self.terraform_get_backend(env) in self.tf_lock_dict:
+            lock_info = self.terraform_get_lock_info(env)
+            return lock_info["id"] if lock_info else None
+        # Unknown backend: lock information is only available by running terraform
         tf_plan_cmd = f'terraform -chdir=iac/environments/{env} plan'
-        r = subprocess.run(tf_plan_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+        r = Cli.run(tf_plan_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True,
+                    env=self.terraform_get_env())
         if "Lock Info:" not in r.stderr:
             return None
         lock_id = r.stderr.split("Lock Info:\n")[-1].split("ID:")[1].split("\n")[0].strip()
         return lock_id
 
+    @tracer.traced()
     def terraform_unlock(self, env: str, auto_approve: bool = False):
         lock_id = self.terraform_get_lock_id(env=env)
         if not lock_id:
             return None  # No lock is detected
         auto_approve_cmd = "-force " if auto_approve else ""
         tf_unlock_cmd = f'terraform {auto_approve_cmd} -chdir=iac/environments/{env} force-unlock {lock_id}'
-        return subprocess.run(tf_unlock_cmd, shell=True)
+        return Cli.run(tf_unlock_cmd, shell=True, env=self.terraform_get_env())
+
+    def unlock_environment(self, env: str, auto_approve: bool = False):
+        """Release the state lock of an environment. Environment is only prepared when a lock is found
+
+        Args:
+            env (str): Environment name
+            auto_approve (bool): Approve unlock automatically
+        """
+        if self.terraform_get_backend(env) not in self.tf_lock_dict:
+            # Unknown backend: lock is only detected by terraform, so the environment is always prepared
+            self.prepare(env_name=env, skip_terraform=True)
+            self.terraform_init(env=env)
+            return self.terraform_unlock(env=env, auto_approve=auto_approve)
+        lock_info = self.terraform_get_lock_info(env)
+        if not lock_info:
+            print(f"No lock detected for environment {env}")
+            return None
+        age = f"{lock_info['age']:.0f}s" if lock_info["age"] is not None else "unknown"
+        print(f"Lock {lock_info['id']} held by {lock_info['holder']} ({lock_info['operation']}), age: {age}")
+        self.prepare(env_name=env, skip_terraform=True)
+        self.terraform_init(env=env)
+        return self.terraform_unlock(env=env, auto_approve=auto_approve)
 
-    def load_modules(self) -> dict:
+    def get_module_workers(self) -> int:
+        """Get the number of modules which could be rendered in the same time
+
+        Defined by command line option, then by module_workers of landscape.yaml settings, default to cpu count
+        """
+        if self.module_workers:
+            return self.module_workers
+        landscape_dict = self.config_store.load(self.landscape_yaml) or {}
+        module_workers = (landscape_dict.get("settings", {}) or {}).get("module_workers", None)
+        return int(module_workers) if module_workers else (os.cpu_count() or 1)
+
+    def apply_module_events(self, module_name: str, module_config: dict):
+        """Apply events of a loaded module
+
+        Args:
+            module_name (str): Module name
+            module_config (dict): Module configuration with the loaded module class
+        """
+        module_instance = module_config["_class"]()
+        for event, event_cfg in (module_config.get("events", {}) or {}).items():
+            event_cfg = {} if not event_cfg else event_cfg
+            if event == "deploy":
+                module_instance.enable(self.module_dir, **event_cfg)
+            elif event == "activate":
+                module_instance.activate(self.module_dir, **event_cfg)
+
+    @classmethod
+    def get_module_render_key(cls, module_name: str, module_config: dict):
+        """Get the key identifying the rendered result of a module
+
+        Args:
+            module_name (str): Module name
+            module_config (dict): Module configuration of modules.yaml
+
+        Returns:
+            Hash of module configuration and installed package version, None if package version is unknown
+        """
+        import importlib.metadata
+        try:
+            package_version = importlib.metadata.version(module_config["package"])
+        except importlib.metadata.PackageNotFoundError:
+            return None  # Local packages could change without version change
+        render_config = {k: v for k, v in module_config.items() if not k.startswith("_")}
+        render_content = json.dumps({"name": module_name, "config": render_config, "version": package_version},
+                                    sort_keys=True, default=str)
+        return hashlib.sha256(render_content.encode()).hexdigest()
+
+    def render_module(self, module_name: str, module_config: dict, render_cache: dict):
+        """Apply module events only if the module configuration or package version is changed
+
+        Args:
+            module_name (str): Module name
+            module_config (dict): Module configuration with the loaded module class
+            render_cache (dict): module name => render key of the last rendering, updated after rendering
+        """
+        render_key = self.get_module_render_key(module_name, module_config)
+        if not self.force_render and render_key and render_cache.get(module_name) == render_key:
+            print(f"Module {module_name} unchanged, skip rendering")
+            return
+        with tracer.span(module_name, category="module"):
+            self.apply_module_events(module_name, module_config)
+        if render_key:
+            render_cache[module_name] = render_key
+        else:
+            render_cache.pop(module_name, None)
+
+    @tracer.traced()
+    def load_modules(self, max_workers: int = None) -> dict:
         """Loading all modules
 
+        Modules are rendered following the depends_on order, independent modules are rendered concurrently.
+        Modules whose configuration and package version are unchanged since the last rendering are skipped.
+
+        Args:
+            max_workers (int): Maximum number of modules rendered in the same time
+
         Returns:
             module_dict: Runtime module list
         """
-        with open(self.module_yaml, 'r') as file:
-            module_dict = yaml.safe_load(file) or {}
+        from xia_framework.dag import DagExecutor
+        module_dict = self.config_store.load(self.module_yaml) or {}
         # Step 1: Get All Module Class
+        package_dict = {}
         for module_name, module_config in module_dict.items():
-            module_obj = importlib.import_module(module_config["package"].replace("-", "_"))
+            package_name = module_config["package"].replace("-", "_")
+            if package_name not in package_dict:
+                package_dict[package_name] = importlib.import_module(package_name)
+            module_obj = package_dict[package_name]
             module_class_name = getattr(module_obj, "modules", {})[module_name]
             module_class = getattr(module_obj, module_class_name)
             module_config["_class"] = module_class
 
         # Step 2: Apply Events
+        render_cache = {}
+        if os.path.exists(self.render_cache_json):
+            with open(self.render_cache_json) as file:
+                render_cache = json.load(file)
+        render_cache = {k: v for k, v in render_cache.items() if k in module_dict}
+        steps = {}
         for module_name, module_config in module_dict.items():
-            module_instance = module_config["_class"]()
-            for event, event_cfg in module_config.get("events", {}).items():
-                event_cfg = {} if not event_cfg else event_cfg
-                if event == "deploy":
-                    module_instance.enable(self.module_dir, **event_cfg)
-                elif event == "activate":
-                    module_instance.activate(self.module_dir, **event_cfg)
+            depends_on = [dep for dep in module_config.get("depends_on", None) or [] if dep in module_dict]
+            steps[module_name] = {
+                "run": lambda results, name=module_name, config=module_config: self.render_module(name, config,
+                                                                                                  render_cache),
+                "depends_on": depends_on
+            }
+        try:
+            DagExecutor(steps, max_workers=max_workers if max_workers else self.get_module_workers()).run()
+        finally:
+            os.makedirs(self.module_dir, exist_ok=True)
+            with open(self.render_cache_json, 'w') as file:
+                json.dump(render_cache, file, indent=2, sort_keys=True)
 
         return module_dict
 
-    def enable_environments(self, env: str):
-        if os.path.exists(os.path.join(self.env_dir, env)):
-            print(f"Local environment {env} found")
-        else:
-            shutil.copytree(os.path.join(self.env_dir, "base"), os.path.join(self.env_dir, env))
+    @classmethod
+    def _get_file_hash(cls, file_path: str) -> str:
+        file_hash = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 16), b""):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    @classmethod
+    def _materialize_file(cls, source_path: str, target_path: str, link_mode: str = "copy"):
+        """Put the source file at the target path, as hardlink / symlink if possible, as copy otherwise"""
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        if os.path.lexists(target_path):
+            os.remove(target_path)
+        try:
+            if link_mode == "hardlink":
+                return os.link(source_path, target_path)
+            elif link_mode == "symlink":
+                return os.symlink(os.path.relpath(source_path, os.path.dirname(target_path)), target_path)
+        except OSError:
+            pass  # Cross device or not supported, fallback to copy
+        shutil.copy2(source_path, target_path)
+
+    def get_env_link_mode(self) -> str:
+        """Get how environment files are materialized: "copy" (default), "hardlink" or "symlink"
+
+        Linked files share their content with the base environment, so an environment specific override must replace
+        the file instead of editing it in place, otherwise the base and all other environments are modified as well.
+        """
+        landscape_dict = self.config_store.load(self.landscape_yaml) or {}
+        return (landscape_dict.get("settings", {}) or {}).get("env_link_mode", "copy")
+
+    @tracer.traced()
+    def enable_environments(self, env: str) -> dict:
+        """Synchronize an environment directory with the base environment
 
-    def main(self):
+        Only changed files are updated. A file modified in the environment since the last synchronization is
+        considered as an environment specific override and is kept.
+
+        Args:
+            env (str): Environment name
+
+        Returns:
+            Synchronization report: {"created": [...], "updated": [...], "removed": [...], "kept": [...]}
+        """
+        report = {"created": [], "updated": [], "removed": [], "kept": []}
+        if env == self.BASE_ENV:
+            return report
+        source_dir, target_dir = os.path.join(self.env_dir, self.BASE_ENV), os.path.join(self.env_dir, env)
+        manifest_path = os.path.join(target_dir, self.ENV_SYNC_MANIFEST)
+        manifest = {}  # relative path => file hash at the last synchronization
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as file:
+                manifest = json.load(file)
+        link_mode = self.get_env_link_mode()
+
+        new_manifest = {}
+        for root, dirs, files in os.walk(source_dir):
+            dirs[:] = [d for d in dirs if d not in self.ENV_SYNC_EXCLUDES]
+            for file_name in [f for f in files if f not in self.ENV_SYNC_EXCLUDES]:
+                source_path = os.path.join(root, file_name)
+                relative_path = os.path.relpath(source_path, source_dir)
+                target_path = os.path.join(target_dir, relative_path)
+                source_hash = self._get_file_hash(source_path)
+                new_manifest[relative_path] = source_hash
+                if not os.path.exists(target_path):
+                    self._materialize_file(source_path, target_path, link_mode)
+                    report["created"].append(relative_path)
+                    continue
+                if os.path.samefile(source_path, target_path):
+                    continue
+                target_hash = self._get_file_hash(target_path)
+                if target_hash == source_hash:
+                    if link_mode != "copy":
+                        self._materialize_file(source_path, target_path, link_mode)
+                elif manifest.get(relative_path) == target_hash:
+                    self._materialize_file(source_path, target_path, link_mode)
+                    report["updated"].append(relative_path)
+                else:
+                    new_manifest[relative_path] = manifest.get(relative_path)
+                    report["kept"].append(relative_path)
+        for relative_path, synced_hash in manifest.items():
+            target_path = os.path.join(target_dir, relative_path)
+            if relative_path not in new_manifest and os.path.isfile(target_path):
+                if self._get_file_hash(target_path) == synced_hash:
+                    os.remove(target_path)
+                    report["removed"].append(relative_path)
+
+        os.makedirs(target_dir, exist_ok=True)
+        with open(manifest_path, 'w') as file:
+            json.dump(new_manifest, file, indent=2, sort_keys=True)
+        print(f"Environment {env} synchronized: " + ", ".join(f"{len(v)} {k}" for k, v in report.items()))
+        for status in ["updated", "removed", "kept"]:
+            for relative_path in report[status]:
+                print(f"  {status}: {relative_path}")
+        return report
+
+    def get_module_packages(self) -> list:
+        if not os.path.exists(self.module_yaml):
+            return []
+        module_dict = self.config_store.load(self.module_yaml) or {}
+        return sorted({module_config["package"] for module_config in module_dict.values()})
+
+    def profile_command(self, args):
+        """Run a command under cProfile
+
+        Args:
+            args: parsed command line arguments
+        """
+        from xia_framework.profiling import Profiler
+        self.module_workers = 1  # cProfile only follows the calling thread
+        stats_file = args.profile_file if args.profile_file else "xia.pstats"
+        Profiler.run(lambda: self.run_book[args.command]["run"](args), stats_file, top_n=args.profile_top,
+                     package_names=self.get_module_packages() if args.profile_packages else None)
+
+    def forward_to_daemon(self, argv: list):
+        """Forward the command to the server started by the serve command
+
+        Args:
+            argv (list): Command line arguments
+
+        Returns:
+            exit status of the command, None if it should be run locally
+        """
+        from xia_framework.daemon import Daemon
+        if not Daemon.is_requested(argv) or "serve" in argv:
+            return None
+        socket_path = Daemon.get_socket_path(self.state_dir, self.__class__.__name__)
+        returncode = Daemon.forward(socket_path, [arg for arg in argv if arg != "--daemon"])
+        if returncode is None:
+            print(f"No server listening on {socket_path}, running locally")
+        return returncode
+
+    def main(self, argv: list = None):
+        """Command line entry point
+
+        Args:
+            argv (list): Command line arguments, default to sys.argv
+        """
+        argv = sys.argv[1:] if argv is None else argv
+        if "--daemon" in argv or os.environ.get("XIA_DAEMON", "") not in ("", "0"):
+            returncode = self.forward_to_daemon(argv)
+            if returncode is not None:
+                if returncode != 0:
+                    raise SystemExit(returncode)
+                return
+        import argparse
         parser = argparse.ArgumentParser(description=f'{self.__class__.__name__} tools')
+        parser.add_argument('--force-install', action='store_true',
+                            help='Run pip install even if installed packages already satisfy packages.yaml')
+        parser.add_argument('--skip-install', action='store_true',
+                            help='Do not install packages, they are already installed by the caller')
+        parser.add_argument('--module-workers', type=int, help='Maximum number of modules rendered in parallel')
+        parser.add_argument('--force-render', action='store_true', help='Render modules even if they are unchanged')
+        parser.add_argument('--reinit', action='store_true', help='Run terraform init even if nothing has changed')
+        parser.add_argument('--trace', type=str, metavar='TRACE_FILE',
+                            help='Print phase timing summary and save Chrome trace events into the given file')
+        parser.add_argument('--profile', action='store_true', help='Profile the command with cProfile')
+        parser.add_argument('--profile-file', type=str, metavar='PSTATS_FILE',
+                            help='Profile statistics file of --profile (default xia.pstats), implies --profile')
+        parser.add_argument('--profile-top', type=int, default=25, help='Number of functions printed by --profile')
+        parser.add_argument('--profile-packages', action='store_true',
+                            help='Print the time spent in each module package when --profile is used')
+        parser.add_argument('--daemon', action='store_true',
+                            help='Forward the command to the server started by serve command (or set XIA_DAEMON=1)')
+        backend_group = parser.add_mutually_exclusive_group()
+        backend_group.add_argument('--record', type=str, metavar='CASSETTE_FILE',
+                                   help='Run external commands and record their results into the cassette file')
+        backend_group.add_argument('--replay', type=str, metavar='CASSETTE_FILE',
+                                   help='Replay results of external commands from the cassette file')
+        parser.add_argument('--replay-latency', type=str,
+                            help='Delay of replayed commands: "recorded" or a number of seconds')
         subparsers = parser.add_subparsers(dest='command', help='Available commands')
 
-        # Create the sub-parsers
-        for cmd in self.run_book:
+        # Create the sub-parsers, only the invoked one is needed unless the help should be displayed
+        command = next((arg for arg in argv if arg in self.run_book), None)
+        for cmd in [command] if command else self.run_book:
             self.run_book[cmd]["cli"](subparsers=subparsers)
 
         # Parse the arguments
-        args = parser.parse_args()
+        args = parser.parse_args(argv)
 
         # Run the command
+        self.force_install = args.force_install
+        self.skip_install = args.skip_install
+        self.module_workers = args.module_workers
+        self.force_render = args.force_render
+        self.reinit = args.reinit
+        if args.record:
+            Cli.configure("record", args.record)
+        elif args.replay:
+            Cli.configure("replay", args.replay, replay_latency=args.replay_latency)
         if args.command in self.run_book:
-            self.run_book[args.command]["run"](args)
+            try:
+                with tracer.span(args.command, category="command"):
+                    if args.profile or args.profile_file:
+                        self.profile_command(args)
+                    else:
+                        self.run_book[args.command]["run"](args)
+            finally:
+                if args.trace:
+                    tracer.print_summary()
+                    tracer.write_chrome_trace(args.trace)
+                    print(f"Trace events saved in {args.trace}")
         else:
             parser.print_help()
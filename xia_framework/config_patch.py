@@ -0,0 +1,68 @@
+import os
+import re
+import shutil
+import tempfile
+
+
+class ConfigPatcher:
+    """Replace commented lines of configuration files
+
+    A commented line like "# key: xxx" is replaced by the new content of the first matching key. All keys are compiled
+    into a single prefix matcher, each file is read once and replaced atomically.
+    """
+    def __init__(self, replace_dict: dict):
+        """
+        Args:
+            replace_dict: replacement dictionary (example {"key:", "key: value\\n"})
+        """
+        self.replace_dict = replace_dict
+        keys = "|".join(re.escape(key_word) for key_word in replace_dict)
+        self.pattern = re.compile(rf"^\s*#\s*({keys})") if replace_dict else None
+
+    def patch_file(self, file_path: str) -> dict:
+        """Patch a file
+
+        Args:
+            file_path: file path of the file to be patched
+
+        Returns:
+            Report as {"matched": [key, ...], "unmatched": [key, ...]}
+        """
+        matched = set()
+        if os.path.isfile(file_path) and self.pattern:
+            file_dir = os.path.dirname(os.path.abspath(file_path))
+            with open(file_path) as config_file, \
+                    tempfile.NamedTemporaryFile("w", dir=file_dir, prefix=".patch_", delete=False) as temp_file:
+                try:
+                    for line in config_file:
+                        match = self.pattern.match(line)
+                        if match:
+                            matched.add(match.group(1))
+                            temp_file.write(self.replace_dict[match.group(1)])
+                        else:
+                            temp_file.write(line)
+                except BaseException:
+                    temp_file.close()
+                    os.remove(temp_file.name)
+                    raise
+            if matched:
+                shutil.copymode(file_path, temp_file.name)
+                os.replace(temp_file.name, file_path)
+            else:
+                os.remove(temp_file.name)
+        elif not os.path.isfile(file_path):
+            print(f"File {file_path} doesn't exist, skip")
+        return {"matched": [k for k in self.replace_dict if k in matched],
+                "unmatched": [k for k in self.replace_dict if k not in matched]}
+
+    @classmethod
+    def patch(cls, patch_dict: dict) -> dict:
+        """Patch several files
+
+        Args:
+            patch_dict: {file_path: replacement dictionary}
+
+        Returns:
+            {file_path: report}, see patch_file for the report format
+        """
+        return {file_path: cls(replace_dict).patch_file(file_path) for file_path, replace_dict in patch_dict.items()}
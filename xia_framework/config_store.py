@@ -0,0 +1,162 @@
+import os
+import copy
+import json
+import glob
+import hashlib
+import tempfile
+import threading
+
+
+class ConfigStore:
+    """Process level cache of yaml configuration files
+
+    Each file is parsed once and kept until its modification time, size or inode changes. Two views are kept:
+        * plain view: loaded by PyYAML (libyaml C loader when available), made of builtin python objects, used for
+          read-only access. Parsed objects are also saved as json into the cache directory, keyed by path and content
+          hash, so that the next processes don't need to parse unchanged files again. Objects which json couldn't
+          represent exactly (dates, non string keys...) are not cached
+        * round-trip view: loaded by ruamel, keeping comments and orders, used when the file will be written back
+
+    Copies are always returned so that callers could modify the loaded objects freely.
+    """
+    def __init__(self, cache_dir: str = None):
+        self._yaml = None
+        self._cache = {}  # (path, view) => (file signature, loaded object)
+        self._lock = threading.RLock()
+        self.cache_dir = cache_dir  # Persistent cache of plain view, disabled if None
+
+    @property
+    def yaml(self):
+        """ruamel round-trip parser, only imported when needed"""
+        if self._yaml is None:
+            from ruamel.yaml import YAML
+            self._yaml = YAML()
+        return self._yaml
+
+    @classmethod
+    def _get_signature(cls, file_path: str):
+        file_stat = os.stat(file_path)
+        return file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino
+
+    @classmethod
+    def _parse_plain(cls, content: bytes):
+        import yaml
+        return yaml.load(content, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+    def _get_cache_prefix(self, file_path: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(file_path.encode()).hexdigest())
+
+    @classmethod
+    def _to_json(cls, data):
+        """Json dump of data, None if data couldn't be loaded back as it is"""
+        try:
+            json_content = json.dumps(data)
+        except (TypeError, ValueError):
+            return None
+        return json_content if json.loads(json_content) == data else None
+
+    def _load_plain(self, file_path: str):
+        """Load plain view, using the persistent cache when the content hash is unchanged"""
+        with open(file_path, 'rb') as file:
+            content = file.read()
+        if not self.cache_dir:
+            return self._parse_plain(content)
+        cache_prefix = self._get_cache_prefix(file_path)
+        cache_file = f"{cache_prefix}.{hashlib.sha256(content).hexdigest()}.json"
+        try:
+            with open(cache_file) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            pass  # Missing or broken cache entry, parse again
+        data = self._parse_plain(content)
+        json_content = self._to_json(data)
+        if json_content is not None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                for old_cache_file in glob.glob(glob.escape(cache_prefix) + ".*.json"):
+                    os.remove(old_cache_file)  # Entries of previous contents
+                with tempfile.NamedTemporaryFile("w", dir=self.cache_dir, suffix=".tmp", delete=False) as temp_file:
+                    temp_file.write(json_content)
+                os.replace(temp_file.name, cache_file)
+            except OSError:
+                pass  # Cache is only an optimization
+        return data
+
+    def _load_rt(self, file_path: str):
+        with open(file_path, 'r') as file:
+            return self.yaml.load(file)
+
+    def _get(self, file_path: str, view: str, loader):
+        file_path = os.path.abspath(file_path)
+        with self._lock:
+            signature = self._get_signature(file_path)
+            cached = self._cache.get((file_path, view))
+            if cached is None or cached[0] != signature:
+                cached = (signature, loader(file_path))
+                self._cache[(file_path, view)] = cached
+            return copy.deepcopy(cached[1])
+
+    def _put(self, file_path: str, view: str, data, dumper):
+        file_path = os.path.abspath(file_path)
+        with self._lock:
+            with open(file_path, 'w') as file:
+                dumper(data, file)
+            for cached_view in ["plain", "rt"]:
+                self._cache.pop((file_path, cached_view), None)
+            self._cache[(file_path, view)] = (self._get_signature(file_path), copy.deepcopy(data))
+
+    def load(self, file_path: str):
+        """Load a yaml file as builtin python objects
+
+        Args:
+            file_path (str): Path of yaml file
+
+        Returns:
+            Loaded objects, empty yaml file is loaded as None
+        """
+        return self._get(file_path, "plain", self._load_plain)
+
+    def load_rt(self, file_path: str):
+        """Load a yaml file with round-trip support (comments and orders are kept)
+
+        Args:
+            file_path (str): Path of yaml file
+
+        Returns:
+            Loaded objects, empty yaml file is loaded as None
+        """
+        return self._get(file_path, "rt", self._load_rt)
+
+    def save(self, file_path: str, data):
+        """Save builtin python objects into a yaml file
+
+        Args:
+            file_path (str): Path of yaml file
+            data: object to be saved
+        """
+        import yaml
+        self._put(file_path, "plain", data,
+                  lambda d, f: yaml.dump(d, f, default_flow_style=False, sort_keys=False))
+
+    def save_rt(self, file_path: str, data):
+        """Save round-trip objects into a yaml file
+
+        Args:
+            file_path (str): Path of yaml file
+            data: object to be saved
+        """
+        self._put(file_path, "rt", data, self.yaml.dump)
+
+    def invalidate(self, file_path: str = None):
+        """Drop cached content
+
+        Args:
+            file_path (str): Path of yaml file. All files will be dropped if not provided
+        """
+        with self._lock:
+            if file_path is None:
+                self._cache.clear()
+                return
+            file_path = os.path.abspath(file_path)
+            for cached_view in ["plain", "rt"]:
+                self._cache.pop((file_path, cached_view), None)
@@ -1,7 +1,4 @@
 import os
-import argparse
-import subprocess
-import yaml
 from xia_framework.application import Application
 from xia_framework.singularity import GcpSingularity
 from xia_framework.tools import CliGH
@@ -26,7 +23,7 @@ class Cosmos(Application):
         self._config_replace(self.landscape_yaml, landscape_replace_dict)
 
         # Prepare common
-        repo_dict = {"owner": CliGH.get_gh_owner(), "repo": CliGH.get_gh_repo()}
+        repo_dict = {"owner": github_owner_name, "repo": CliGH.get_gh_repo()}
         var_dict = CliGH.get_gh_variable_dict()
 
         # Module level init-config
@@ -40,8 +37,7 @@ class Cosmos(Application):
     def bigbang(self):
         """Create the cosmos administration project
         """
-        with open(self.landscape_yaml, 'r') as file:
-            landscape_dict = yaml.safe_load(file) or {}
+        landscape_dict = self.config_store.load(self.landscape_yaml) or {}
         current_settings = landscape_dict["settings"] or {}
 
         # Step 1: Define Cosmos Topology
@@ -117,7 +113,12 @@ class Cosmos(Application):
         self.activate_module(module_uri=args.module_uri)
 
     def cmd_plan(self, args):
-        return self.prepare(env_name=self.BASE_ENV, skip_terraform=True)
+        self.prepare(env_name=self.BASE_ENV, skip_terraform=True)
+        r = self.terraform_init(env=self.BASE_ENV)
+        if r.returncode == 0:
+            r = self.terraform_plan(env=self.BASE_ENV)  # Saved plan is reused by apply
+        if r.returncode != 0:
+            raise SystemExit(r.returncode)
 
     def cmd_apply(self, args):
         self.prepare(env_name=self.BASE_ENV, skip_terraform=True)
@@ -130,9 +131,7 @@ class Cosmos(Application):
         self.terraform_destroy(env=self.BASE_ENV, auto_approve=args.auto_approve)
 
     def cmd_unlock(self, args):
-        self.prepare(env_name=self.BASE_ENV, skip_terraform=True)
-        self.terraform_init(env=self.BASE_ENV)
-        self.terraform_unlock(env=self.BASE_ENV, auto_approve=args.auto_approve)
+        self.unlock_environment(env=self.BASE_ENV, auto_approve=args.auto_approve)
 
 
 if __name__ == "__main__":
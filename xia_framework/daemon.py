@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import socket
+import traceback
+from xia_framework.tracing import tracer
+
+
+class Daemon:
+    """Keep a warm layer instance (Cosmos, Foundation, Application...) behind a unix socket
+
+    The client forwards its command line arguments and environment variables together with its standard file
+    descriptors, so the commands are run by the server as if they were run by the client. Commands are run one after
+    another.
+    """
+    ENV_DAEMON = "XIA_DAEMON"
+    BUFFER_SIZE = 65536
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.socket_path = self.get_socket_path(instance.state_dir, instance.__class__.__name__)
+        self.package_versions = {}  # package name => installed version when imported
+
+    @classmethod
+    def get_socket_path(cls, state_dir: str, layer_name: str) -> str:
+        return os.path.sep.join([state_dir, f"{layer_name.lower()}.sock"])
+
+    @classmethod
+    def is_requested(cls, argv: list) -> bool:
+        return "--daemon" in argv or os.environ.get(cls.ENV_DAEMON, "") not in ("", "0")
+
+    @classmethod
+    def forward(cls, socket_path: str, argv: list):
+        """Forward a command to the server
+
+        Args:
+            socket_path (str): Server socket path
+            argv (list): Command line arguments
+
+        Returns:
+            exit status of the command, None if no server is listening
+        """
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            client.close()
+            return None
+        with client:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            request = json.dumps({"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}).encode() + b"\n"
+            sent = socket.send_fds(client, [request[:cls.BUFFER_SIZE]],
+                                   [sys.stdin.fileno(), sys.stdout.fileno(), sys.stderr.fileno()])
+            if sent < len(request):
+                client.sendall(request[sent:])
+            response = b""
+            while True:
+                data = client.recv(cls.BUFFER_SIZE)
+                if not data:
+                    break
+                response += data
+        if not response:
+            return 1  # Server stopped during the command
+        return json.loads(response)["returncode"]
+
+    def reload_changed_packages(self):
+        """Drop imported module packages whose installed version has changed, load_modules will import them again"""
+        import importlib.metadata
+        importlib.invalidate_caches()
+        for package_name in self.instance.get_module_packages():
+            try:
+                version = importlib.metadata.version(package_name)
+            except importlib.metadata.PackageNotFoundError:
+                version = None
+            if package_name in self.package_versions and self.package_versions[package_name] != version:
+                module_name = package_name.replace("-", "_")
+                for loaded_name in [name for name in sys.modules
+                                    if name == module_name or name.startswith(module_name + ".")]:
+                    del sys.modules[loaded_name]
+                print(f"Package {package_name} changed to version {version}, reloaded")
+            self.package_versions[package_name] = version
+
+    def run_command(self, argv: list, fds: list, env: dict = None) -> int:
+        """Run a command with the standard file descriptors and environment variables of the client
+
+        Args:
+            argv (list): Command line arguments
+            fds (list): stdin, stdout, stderr of the client
+            env (dict): Environment variables of the client, server ones are kept if not provided
+
+        Returns:
+            exit status
+        """
+        from xia_framework.tools import Cli, CliGH
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved_fds = [os.dup(fd) for fd in range(3)]
+        saved_env = dict(os.environ)
+        try:
+            for fd, client_fd in enumerate(fds):
+                os.dup2(client_fd, fd)
+            # Repository variables, traces and command backend only live for one command
+            CliGH._variable_cache.clear()
+            CliGH._repo_cache.clear()
+            tracer.clear()
+            Cli.reset()
+            if env is not None:
+                os.environ.clear()
+                os.environ.update({k: v for k, v in env.items() if k != self.ENV_DAEMON})
+            try:
+                self.reload_changed_packages()
+                self.instance.main(argv)
+                return 0
+            except SystemExit as e:
+                return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception:
+                traceback.print_exc()
+                return 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.environ.clear()
+            os.environ.update(saved_env)
+            Cli.reset()
+            for fd, saved_fd in enumerate(saved_fds):
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+            for client_fd in fds:
+                os.close(client_fd)
+
+    def serve(self):
+        """Serve commands until interrupted"""
+        os.environ.pop(self.ENV_DAEMON, None)  # Commands must be run by the server itself
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)  # Left by a stopped server
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen()
+        print(f"{self.instance.__class__.__name__} serving on {self.socket_path}, stop with Ctrl-C")
+        try:
+            while True:
+                connection, _ = server.accept()
+                with connection:
+                    message, fds, _, _ = socket.recv_fds(connection, self.BUFFER_SIZE, 3)
+                    while not message.endswith(b"\n"):
+                        data = connection.recv(self.BUFFER_SIZE)
+                        if not data:
+                            break
+                        message += data
+                    request = json.loads(message)
+                    if len(fds) != 3 or request.get("cwd") != os.getcwd():
+                        if len(fds) == 3:
+                            os.write(fds[2], f"Server is running in {os.getcwd()}\n".encode())
+                        for client_fd in fds:
+                            os.close(client_fd)
+                        returncode = 1
+                    else:
+                        returncode = self.run_command(request["argv"], fds, env=request.get("env"))
+                    connection.sendall(json.dumps({"returncode": returncode}).encode())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            os.remove(self.socket_path)
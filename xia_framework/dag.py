@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class DagExecutor:
+    """Run steps following their dependencies. Steps without pending dependencies are run concurrently
+
+    Steps are defined as a dictionary with the following format:
+        {"step_name": {"run": callable, "depends_on": ["other_step_name", ...]}}
+    Each callable receives the dictionary of results of the finished steps.
+    """
+    def __init__(self, steps: dict, max_workers: int = None):
+        self.steps = steps
+        self.max_workers = max_workers
+        self.get_schedule(steps)  # Fail fast before any step is run
+
+    @classmethod
+    def get_schedule(cls, steps: dict) -> list:
+        """Get step execution layers, steps of the same layer could be run concurrently
+
+        Args:
+            steps (dict): Step definition
+
+        Returns:
+            List of step name list
+        """
+        pending = {}
+        for step_name, step_config in steps.items():
+            depends_on = step_config.get("depends_on", None) or []
+            for dependency in depends_on:
+                if dependency not in steps:
+                    raise ValueError(f"Step {step_name} depends on unknown step {dependency}")
+            pending[step_name] = set(depends_on)
+        schedule, done = [], set()
+        while pending:
+            layer = [step_name for step_name, depends_on in pending.items() if depends_on <= done]
+            if not layer:
+                raise ValueError(f"Cycle detected among steps {sorted(pending)}")
+            for step_name in layer:
+                pending.pop(step_name)
+            done.update(layer)
+            schedule.append(layer)
+        return schedule
+
+    def run(self) -> dict:
+        """Run all steps
+
+        Returns:
+            dictionary of step name: step result
+        """
+        if self.max_workers == 1:
+            # Run in the calling thread, step by step
+            results = {}
+            for layer in self.get_schedule(self.steps):
+                for step_name in layer:
+                    results[step_name] = self.steps[step_name]["run"](dict(results))
+            return results
+        results, running = {}, {}
+        pending = {name: set(config.get("depends_on", None) or []) for name, config in self.steps.items()}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for step_name in [name for name, depends_on in pending.items() if depends_on <= set(results)]:
+                    pending.pop(step_name)
+                    future = executor.submit(self.steps[step_name]["run"], dict(results))
+                    running[future] = step_name
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                errors = []
+                for future in finished:
+                    step_name = running.pop(future)
+                    if future.exception() is not None:
+                        errors.append(future.exception())
+                    else:
+                        results[step_name] = future.result()
+                if errors:
+                    wait(list(running))  # Let started steps finish but don't start new ones
+                    raise errors[0]
+        return results
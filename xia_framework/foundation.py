@@ -1,40 +1,47 @@
 import os
-import argparse
+import sys
+import time
 import subprocess
-import yaml
+from xia_framework.base import Base
 from xia_framework.application import Application
-from xia_framework.tools import CliGH
+from xia_framework.tools import Cli, CliGCloud, CliGH
 
 
 class Foundation(Application):
+    APP_FIELDS = ["visibility", "repository_owner", "repository_name", "template_owner", "template_name"]
+
     def __init__(self, config_dir: str = "config", **kwargs):
         super().__init__(config_dir=config_dir, **kwargs)
         self.application_yaml = os.path.sep.join([self.config_dir, "applications.yaml"])
         self.run_book.update({
             "activate-module": {"cli": self.cli_activate_module, "run": self.cmd_activate_module},
-            "create-app": {"cli": self.cli_create_app, "run": self.cmd_create_app}
+            "create-app": {"cli": self.cli_create_app, "run": self.cmd_create_app},
+            "create-apps": {"cli": self.cli_create_apps, "run": self.cmd_create_apps},
+            "plan-all": {"cli": self.cli_plan_all, "run": self.cmd_plan_all},
+            "apply-all": {"cli": self.cli_apply_all, "run": self.cmd_apply_all},
         })
 
     def init_config(self):
         github_owner_name = CliGH.get_gh_owner()
+        var_dict = CliGH.get_gh_variable_dict()
         landscape_replace_dict = {
-            "cosmos_name:": f"  cosmos_name: {CliGH.get_gh_action_var('cosmos_name')}\n",
-            "realm_name:": f"  realm_name: {CliGH.get_gh_action_var('realm_name')}\n",
-            "foundation_name:": f"  foundation_name: {CliGH.get_gh_action_var('foundation_name')}\n",
+            "cosmos_name:": f"  cosmos_name: {var_dict.get('cosmos_name')}\n",
+            "realm_name:": f"  realm_name: {var_dict.get('realm_name')}\n",
+            "foundation_name:": f"  foundation_name: {var_dict.get('foundation_name')}\n",
             "default_repository_owner:": f"  default_repository_owner: {github_owner_name}\n",
         }
-        self._config_replace(self.landscape_yaml, landscape_replace_dict)
-        tf_bucket_name = CliGH.get_gh_action_var('tf_bucket_name')
+        patch_dict = {self.landscape_yaml: landscape_replace_dict}
+        tf_bucket_name = var_dict.get('tf_bucket_name')
         if tf_bucket_name:
             tfstate_replace_dict = {
                 "tf_bucket:": f"tf_bucket: {tf_bucket_name}\n",
             }
             tfstate_file_path = os.path.sep.join([self.config_dir, "core", "tfstate.yaml"])
-            self._config_replace(tfstate_file_path, tfstate_replace_dict)
+            patch_dict[tfstate_file_path] = tfstate_replace_dict
+        self._config_patch(patch_dict)
 
     def create_backend(self, foundation_name: str):
-        with open(self.landscape_yaml, 'r') as file:
-            landscape_dict = yaml.safe_load(file) or {}
+        landscape_dict = self.config_store.load(self.landscape_yaml) or {}
         current_settings = landscape_dict.get("settings", {})
         if not current_settings.get("cosmos_name", ""):
             raise ValueError("Cosmos Name must be defined")
@@ -43,26 +50,23 @@ class Foundation(Application):
         bucket_name = current_settings["realm_name"] + "_" + foundation_name
         foundation_region = current_settings.get("foundation_region", "eu")
         bucket_project = current_settings['cosmos_name']
-        check_bucket_cmd = f"gsutil ls -b gs://{bucket_name}"
-        r = subprocess.run(check_bucket_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
-        if "AccessDeniedException" not in r.stderr and "NotFound" not in r.stderr:
+        if CliGCloud.gcs_bucket_exists(bucket_name):
             print(f"Bucket {bucket_name} already exists")
         else:
             create_bucket_cmd = f"gsutil mb -l {foundation_region} -p {bucket_project} gs://{bucket_name}/"
-            r = subprocess.run(create_bucket_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+            r = Cli.run(create_bucket_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
             if "ERROR" not in r.stderr:
                 print(f"Bucket {bucket_name} create successfully")
+                CliGCloud.resource_cache.add("buckets", bucket_name)
                 current_settings["foundation_name"] = foundation_name
                 if not current_settings.get("project_prefix", ""):
                     current_settings["project_prefix"] = foundation_name + "-"
-                with open(self.landscape_yaml, 'w') as file:
-                    yaml.dump(landscape_dict, file, default_flow_style=False, sort_keys=False)
+                self.config_store.save(self.landscape_yaml, landscape_dict)
             else:
                 print(r.stderr)
 
     def terraform_get_state_file_prefix(self, env_name: str = None):
-        with open(self.landscape_yaml, 'r') as file:
-            landscape_dict = yaml.safe_load(file) or {}
+        landscape_dict = self.config_store.load(self.landscape_yaml) or {}
         current_settings = landscape_dict.get("settings", {})
         realm_name = current_settings["realm_name"]
         foundation_name = current_settings["foundation_name"]
@@ -72,8 +76,7 @@ class Foundation(Application):
         if not self.package_pattern.match(package):
             return ValueError("Package name doesn't meet the required pattern")
 
-        with open(self.module_yaml, 'r') as file:
-            module_dict = yaml.safe_load(file) or {}
+        module_dict = self.config_store.load(self.module_yaml) or {}
 
         if module_name in module_dict:
             print(f"Module {module_name} already exists")
@@ -81,37 +84,262 @@ class Foundation(Application):
             module_dict[module_name] = {"package": package, "class": module_class}
             print(f"Module {module_name} Registered")
 
-        with open(self.module_yaml, 'w') as file:
-            yaml.dump(module_dict, file, default_flow_style=False, sort_keys=False)
+        self.config_store.save(self.module_yaml, module_dict)
 
     def create_app(self, app_name: str, module_list: list, visibility: str = None,
                    repository_owner: str = None, repository_name: str = None,
                    template_owner: str = None, template_name: str = None):
-        with open(self.module_yaml, 'r') as module_file:
-            module_dict = self.yaml.load(module_file) or {}
-        with open(self.application_yaml, 'r') as app_file:
-            app_dict = self.yaml.load(app_file) or {}
-        if app_name in app_dict:
-            raise ValueError(f"Application {app_name} already exists")
-        params = {"visibility": visibility, "repository_owner": repository_owner, "repository_name": repository_name,
-                  "template_owner": template_owner, "template_name": template_name}
-        app_dict[app_name] = {k: v for k, v in params.items() if v}  # Removing None Value
-        app_dict[app_name] = app_dict[app_name] if app_dict[app_name] else None  # Put None value
-        module_changed = False
-        for module_name in module_list:
+        app_config = {"modules": module_list, "visibility": visibility, "repository_owner": repository_owner,
+                      "repository_name": repository_name, "template_owner": template_owner,
+                      "template_name": template_name}
+        errors = self.create_apps({app_name: app_config}, raise_errors=False)
+        if errors:
+            raise ValueError(errors[app_name][0])
+
+    def validate_apps(self, app_configs: dict, app_dict: dict, module_dict: dict) -> dict:
+        """Validate application definitions before creation
+
+        Args:
+            app_configs (dict): application name => application configuration
+            app_dict (dict): existing applications
+            module_dict (dict): existing modules
+
+        Returns:
+            application name => error message list, only applications with errors are present
+        """
+        errors = {}
+        for app_name, app_config in app_configs.items():
+            app_errors = list(app_config.get("_manifest_errors", []))
+            if app_name in app_dict:
+                app_errors.append(f"Application {app_name} already exists")
+            unknown_fields = [k for k in app_config if k not in ["modules", "_manifest_errors"] + self.APP_FIELDS]
+            if unknown_fields:
+                app_errors.append(f"Application {app_name} has unknown fields {unknown_fields}")
+            for module_name in app_config.get("modules", None) or []:
+                if module_name not in module_dict:
+                    app_errors.append(f"Module {module_name} is not presented yet")
+            if app_errors:
+                errors[app_name] = app_errors
+        return errors
+
+    def create_apps(self, app_configs: dict, raise_errors: bool = True) -> dict:
+        """Create several applications with a single load / modify / save of configuration files
+
+        All applications are validated first, nothing is saved if any of them is not valid
+
+        Args:
+            app_configs (dict): application name => {"modules": [...], "visibility": ..., "repository_owner": ...}
+            raise_errors (bool): Raise ValueError if validation fails
+
+        Returns:
+            application name => error message list, empty if all applications are created
+        """
+        module_dict = self.config_store.load_rt(self.module_yaml) or {}
+        app_dict = self.config_store.load_rt(self.application_yaml) or {}
+        app_configs = {app_name: app_config or {} for app_name, app_config in app_configs.items()}
+        errors = self.validate_apps(app_configs, app_dict, module_dict)
+        if errors:
+            for app_name, app_errors in errors.items():
+                for app_error in app_errors:
+                    print(f"{app_name}: {app_error}")
+            if raise_errors:
+                raise ValueError(f"{len(errors)} application(s) are not valid, nothing is created")
+            return errors
+
+        activate_scopes = {}  # module name => applications already in activate_scope
+        for app_name, app_config in app_configs.items():
+            params = {k: v for k, v in app_config.items() if k in self.APP_FIELDS and v}  # Removing None Value
+            app_dict[app_name] = params if params else None  # Put None value
+            for module_name in app_config.get("modules", None) or []:
+                if module_name not in activate_scopes:
+                    if not module_dict[module_name].get("activate_scope", None):
+                        module_dict[module_name]["activate_scope"] = []
+                    activate_scopes[module_name] = set(module_dict[module_name]["activate_scope"])
+                if app_name not in activate_scopes[module_name]:
+                    module_dict[module_name]["activate_scope"].append(app_name)
+                    activate_scopes[module_name].add(app_name)
+        # Save results
+        if activate_scopes:
+            self.config_store.save_rt(self.module_yaml, module_dict)
+        self.config_store.save_rt(self.application_yaml, app_dict)
+        print(f"{len(app_configs)} application(s) created")
+        return {}
+
+    @classmethod
+    def load_app_manifest(cls, manifest_path: str) -> dict:
+        """Load application manifest
+
+        Manifest is a yaml mapping of application name => application configuration, or a list of application
+        configurations with a "name" field. Modules could be given as a list or as a comma separated string. Entries
+        without name or with a duplicated name keep their errors under "_manifest_errors", reported by validate_apps.
+
+        Args:
+            manifest_path (str): Manifest file path
+
+        Returns:
+            application name => application configuration
+        """
+        manifest = cls.config_store.load(manifest_path) or {}
+        if not isinstance(manifest, list):
+            manifest = [dict(app_config or {}, name=app_name) for app_name, app_config in manifest.items()]
+        app_configs = {}
+        for i, app_config in enumerate(manifest):
+            app_config = dict(app_config or {})
+            app_name = app_config.pop("name", None)
+            if not app_name:
+                app_name = f"<entry {i + 1}>"
+                app_config["_manifest_errors"] = [f"Manifest entry {i + 1} has no name"]
+            elif app_name in app_configs:
+                app_config = app_configs[app_name]
+                app_config["_manifest_errors"] = [f"Application {app_name} is defined several times in the manifest"]
+                continue
+            if isinstance(app_config.get("modules", None), str):
+                app_config["modules"] = app_config["modules"].split(",")
+            app_configs[app_name] = app_config
+        return app_configs
+
+    def get_app_names(self, app_names: str = None, module_name: str = None) -> list:
+        """Get application list to be handled
+
+        Args:
+            app_names (str): Application names separated by comma
+            module_name (str): Take applications of the activate scope of the module
+
+        Returns:
+            application name list, all applications of applications.yaml if nothing is specified
+        """
+        app_dict = self.config_store.load(self.application_yaml) or {}
+        if app_names:
+            selected_apps = app_names.split(",")
+        elif module_name:
+            module_dict = self.config_store.load(self.module_yaml) or {}
             if module_name not in module_dict:
                 raise ValueError(f"Module {module_name} is not presented yet")
-            if "activate_scope" in module_dict[module_name]:
-                module_dict[module_name]["activate_scope"].append(app_name)
-            else:
-                module_dict[module_name]["activate_scope"] = [app_name]
-            module_changed = True
-        # Save results
-        if module_changed:
-            with open(self.module_yaml, 'w') as module_file:
-                self.yaml.dump(module_dict, module_file)
-        with open(self.application_yaml, 'w') as app_file:
-            self.yaml.dump(app_dict, app_file)
+            selected_apps = module_dict[module_name].get("activate_scope", None) or []
+        else:
+            selected_apps = list(app_dict)
+        unknown_apps = [app_name for app_name in selected_apps if app_name not in app_dict]
+        if unknown_apps:
+            raise ValueError(f"Applications {unknown_apps} are not defined in applications.yaml")
+        return selected_apps
+
+    def get_app_dir(self, app_name: str) -> str:
+        """Get the working directory of an application, the repository is cloned if the directory doesn't exist
+
+        Applications are located in the "apps_dir" directory of landscape settings (parent directory by default)
+
+        Args:
+            app_name (str): Application name
+
+        Returns:
+            Application directory
+        """
+        landscape_dict = self.config_store.load(self.landscape_yaml) or {}
+        current_settings = landscape_dict.get("settings", {}) or {}
+        app_config = (self.config_store.load(self.application_yaml) or {}).get(app_name, None) or {}
+        repository_name = app_config.get("repository_name", None) or app_name
+        app_dir = os.path.join(current_settings.get("apps_dir", None) or os.path.pardir, repository_name)
+        if not os.path.isdir(app_dir):
+            repository_owner = app_config.get("repository_owner", None) or \
+                current_settings.get("default_repository_owner", None)
+            print(f"Cloning {repository_owner}/{repository_name} into {app_dir}")
+            CliGH.clone_repo(repository_owner, repository_name, app_dir)
+        return app_dir
+
+    def install_app_requirements(self, app_dirs: dict):
+        """Install packages needed by several applications once, before they are run in parallel
+
+        Applications share the same python environment, so they must agree on package versions.
+
+        Args:
+            app_dirs (dict): application name => application directory
+        """
+        package_addresses = {}  # package name => {package address: [application name, ...]}
+        for app_name, app_dir in app_dirs.items():
+            app_base = Base(config_dir=os.path.join(app_dir, self.config_dir))
+            if not os.path.exists(app_base.package_yaml):
+                continue
+            for package_name, package_address in app_base.get_needed_packages().items():
+                package_addresses.setdefault(package_name, {}).setdefault(package_address, []).append(app_name)
+        conflicts = {k: v for k, v in package_addresses.items() if len(v) > 1}
+        if conflicts:
+            for package_name, address_apps in conflicts.items():
+                for package_address, app_names in address_apps.items():
+                    print(f"{package_name}: {package_address} needed by {', '.join(app_names)}")
+            raise ValueError(f"Applications need different versions of {', '.join(conflicts)}, "
+                             f"they can't be run together")
+        missing_packages = [package_address for package_name, address_apps in package_addresses.items()
+                            for package_address in address_apps
+                            if not self.is_package_installed(package_name, package_address)]
+        if missing_packages:
+            Cli.run(['pip', 'install', *missing_packages, *self.get_pip_options()], check=True)
+
+    def run_app(self, app_dir: str, action: str, env_name: str, auto_approve: str = None) -> dict:
+        """Run application layer plan/apply in the application directory
+
+        Each application has its own working directory so its own landscape and terraform state prefix. Packages are
+        expected to be installed by install_app_requirements.
+
+        Args:
+            app_dir (str): Application directory
+            action (str): "plan" or "apply"
+            env_name (str): Environment name
+            auto_approve (str): Approve apply automatically
+
+        Returns:
+            {"returncode": exit status, "duration": seconds, "output": command output}
+        """
+        start_time = time.perf_counter()
+        app_cmd = [sys.executable, "-m", "xia_framework.application", "--skip-install", action, "-e", env_name]
+        if action == "apply":
+            app_cmd += ["-y", auto_approve]
+        r = Cli.run(app_cmd, cwd=app_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        return {"returncode": r.returncode, "duration": time.perf_counter() - start_time, "output": r.stdout}
+
+    def run_apps(self, app_names: list, action: str, env_name: str, auto_approve: str = None,
+                 max_workers: int = None) -> dict:
+        """Run plan/apply of several applications in parallel
+
+        Args:
+            app_names (list): Application name list
+            action (str): "plan" or "apply"
+            env_name (str): Environment name
+            auto_approve (str): Approve apply automatically
+            max_workers (int): Maximum number of applications handled in the same time
+
+        Returns:
+            dictionary of application name: result, see run_app for the result format
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        if action == "apply" and not auto_approve:
+            raise ValueError("Applying several applications in parallel needs auto approve")
+        if not app_names:
+            print("No application selected")
+            return {}
+        max_workers = max_workers if max_workers else min(len(app_names), os.cpu_count() or 1)
+        app_dirs, app_results = {}, {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            dir_futures = {app_name: executor.submit(self.get_app_dir, app_name) for app_name in app_names}
+            for app_name, future in dir_futures.items():
+                try:
+                    app_dirs[app_name] = future.result()
+                except Exception as e:
+                    app_results[app_name] = {"returncode": 1, "duration": 0.0, "output": str(e)}
+            self.install_app_requirements(app_dirs)
+            futures = {app_name: executor.submit(self.run_app, app_dir, action, env_name, auto_approve)
+                       for app_name, app_dir in app_dirs.items()}
+            app_results.update({app_name: future.result() for app_name, future in futures.items()})
+        app_results = {app_name: app_results[app_name] for app_name in app_names}
+        failed_apps = [app_name for app_name, result in app_results.items() if result["returncode"] != 0]
+        for app_name in failed_apps:
+            print(f"===== {app_name} output =====")
+            print(app_results[app_name]["output"])
+        print(f"Application {action} results of environment {env_name}:")
+        for app_name, result in app_results.items():
+            status = "OK" if result["returncode"] == 0 else f"FAILED (exit status {result['returncode']})"
+            print(f"  {app_name}: {status} in {result['duration']:.1f}s")
+        print(f"{len(app_names) - len(failed_apps)} succeeded, {len(failed_apps)} failed")
+        return app_results
 
     @classmethod
     def cli_activate_module(cls, subparsers):
@@ -132,6 +360,30 @@ class Foundation(Application):
         sub_parser.add_argument('--template-owner', type=str, help='Template Owner')
         sub_parser.add_argument('--template-name', type=str, help='Template Name')
 
+    @classmethod
+    def cli_create_apps(cls, subparsers):
+        sub_parser = subparsers.add_parser('create-apps',
+                                           help='Creation of several applications defined in a manifest')
+        sub_parser.add_argument('-f', '--manifest', type=str, required=True, help='Application manifest yaml file')
+
+    @classmethod
+    def _add_app_selection_arguments(cls, sub_parser):
+        sub_parser.add_argument('-e', '--env_name', type=str, required=True, help='Environment Name')
+        sub_parser.add_argument('--apps', type=str, help='Application names separated by comma')
+        sub_parser.add_argument('-m', '--module', type=str, help='Select applications activating the module')
+        sub_parser.add_argument('--max-workers', type=int, help='Maximum applications handled in parallel')
+
+    @classmethod
+    def cli_plan_all(cls, subparsers):
+        sub_parser = subparsers.add_parser('plan-all', help='Plan selected applications (all by default)')
+        cls._add_app_selection_arguments(sub_parser)
+
+    @classmethod
+    def cli_apply_all(cls, subparsers):
+        sub_parser = subparsers.add_parser('apply-all', help='Apply selected applications (all by default)')
+        cls._add_app_selection_arguments(sub_parser)
+        sub_parser.add_argument('-y', '--auto-approve', type=str, help='Approve apply automatically')
+
     @classmethod
     def cli_plan(cls, subparsers):
         subparsers.add_parser('plan', help=f'Prepare {cls.__name__} Deploy time objects')
@@ -160,8 +412,29 @@ class Foundation(Application):
                         repository_owner=args.repository_owner, repository_name=args.repository_name,
                         template_owner=args.template_owner, template_name=args.template_name)
 
+    def cmd_create_apps(self, args):
+        self.create_apps(self.load_app_manifest(args.manifest))
+
+    def cmd_plan_all(self, args):
+        app_names = self.get_app_names(app_names=args.apps, module_name=args.module)
+        app_results = self.run_apps(app_names, "plan", env_name=args.env_name, max_workers=args.max_workers)
+        if any(result["returncode"] for result in app_results.values()):
+            raise SystemExit(1)
+
+    def cmd_apply_all(self, args):
+        app_names = self.get_app_names(app_names=args.apps, module_name=args.module)
+        app_results = self.run_apps(app_names, "apply", env_name=args.env_name, auto_approve=args.auto_approve,
+                                    max_workers=args.max_workers)
+        if any(result["returncode"] for result in app_results.values()):
+            raise SystemExit(1)
+
     def cmd_plan(self, args):
-        return self.prepare(env_name=self.BASE_ENV, skip_terraform=True)
+        self.prepare(env_name=self.BASE_ENV, skip_terraform=True)
+        r = self.terraform_init(env=self.BASE_ENV)
+        if r.returncode == 0:
+            r = self.terraform_plan(env=self.BASE_ENV)  # Saved plan is reused by apply
+        if r.returncode != 0:
+            raise SystemExit(r.returncode)
 
     def cmd_apply(self, args):
         self.prepare(env_name=self.BASE_ENV, skip_terraform=True)
@@ -174,9 +447,7 @@ class Foundation(Application):
         self.terraform_destroy(env=self.BASE_ENV, auto_approve=args.auto_approve)
 
     def cmd_unlock(self, args):
-        self.prepare(env_name=self.BASE_ENV, skip_terraform=True)
-        self.terraform_init(env=self.BASE_ENV)
-        self.terraform_unlock(env=self.BASE_ENV, auto_approve=args.auto_approve)
+        self.unlock_environment(env=self.BASE_ENV, auto_approve=args.auto_approve)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+import os
+import sys
+import cProfile
+import pstats
+
+
+class Profiler:
+    """cProfile wrapper of run-book commands"""
+    @classmethod
+    def run(cls, func, stats_file: str, top_n: int = 25, package_names: list = None):
+        """Profile a function call, save the statistics and print the top functions
+
+        Args:
+            func: function to be profiled, called without parameters
+            stats_file (str): .pstats output file path
+            top_n (int): Number of functions to be printed, ordered by cumulative time
+            package_names (list): Also print the time spent in the code of each given package
+
+        Returns:
+            Result of the function
+        """
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func)
+        finally:
+            profile.dump_stats(stats_file)
+            stats = pstats.Stats(profile, stream=sys.stdout)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_n)
+            if package_names is not None:
+                cls.print_package_times(cls.get_package_times(stats, package_names))
+            print(f"Profile statistics saved in {stats_file}")
+
+    @classmethod
+    def get_package_dirs(cls, package_names: list) -> dict:
+        """Get source directories of imported packages
+
+        Args:
+            package_names (list): package names as defined in packages.yaml
+
+        Returns:
+            package name => source directory
+        """
+        package_dirs = {}
+        for package_name in package_names:
+            module_obj = sys.modules.get(package_name.replace("-", "_"))
+            if module_obj is not None and getattr(module_obj, "__file__", None):
+                package_dirs[package_name] = os.path.dirname(os.path.abspath(module_obj.__file__))
+        return package_dirs
+
+    @classmethod
+    def get_package_times(cls, stats: pstats.Stats, package_names: list) -> dict:
+        """Attribute the time spent in functions to the packages holding their source code
+
+        Args:
+            stats (pstats.Stats): Profile statistics
+            package_names (list): package names as defined in packages.yaml
+
+        Returns:
+            package name => own time in seconds, time spent elsewhere is counted as "(others)"
+        """
+        package_dirs = cls.get_package_dirs(package_names)
+        package_times = {package_name: 0.0 for package_name in package_dirs}
+        package_times["(others)"] = 0.0
+        for (file_name, line_number, func_name), func_stats in stats.stats.items():
+            own_time = func_stats[2]
+            file_path = os.path.abspath(file_name) if not file_name.startswith("<") and file_name != "~" else ""
+            for package_name, package_dir in package_dirs.items():
+                if file_path.startswith(package_dir + os.path.sep):
+                    package_times[package_name] += own_time
+                    break
+            else:
+                package_times["(others)"] += own_time
+        return package_times
+
+    @classmethod
+    def print_package_times(cls, package_times: dict):
+        name_width = max(len(package_name) for package_name in package_times)
+        print(f"{'Package':<{name_width}} {'Own time(s)':>12}")
+        for package_name, own_time in sorted(package_times.items(), key=lambda x: x[1], reverse=True):
+            print(f"{package_name:<{name_width}} {own_time:>12.3f}")
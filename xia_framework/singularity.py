@@ -1,4 +1,3 @@
-import subprocess
 from xia_framework.tools import CliGCloud
 
 
@@ -14,16 +13,35 @@ class Singularity:
             Completed input dict
         """
 
+    @classmethod
+    def get_steps(cls, **kwargs) -> dict:
+        """Get Bigbang steps, see DagExecutor for the step format
+
+        Args:
+            **kwargs: Bigbang parameters
+
+        Returns:
+            Step definition dictionary
+        """
+        return {}
+
     @classmethod
     def bigbang(cls, **kwargs):
-        """Bigbang of different topology
+        """Bigbang of different topology. Independent steps are run concurrently
 
         Args:
             **kwargs: Bigbang parameters
+
+        Returns:
+            dictionary of step name: step result
         """
+        from xia_framework.dag import DagExecutor
+        return DagExecutor(cls.get_steps(**kwargs)).run()
+
 
+class GcpSingularity(Singularity):
+    SERVICES = ["cloudresourcemanager", "iam", "cloudbilling", "storage"]
 
-class GcpSingularity:
     @classmethod
     def get_inputs(cls, input_dict: dict):
         if "cosmos_project" not in input_dict:
@@ -39,7 +57,18 @@ class GcpSingularity:
         return input_dict
 
     @classmethod
-    def bigbang(cls, cosmos_project: str, bucket_name: str, bucket_region: str, **kwargs):
+    def get_billing_account(cls, results: dict, project_name: str = None):
+        if project_name and CliGCloud.gcp_billing_linked(project_name):
+            print(f"Project {project_name} already linked to a Billing Account, skip")
+            return None
+        billing_account = CliGCloud.get_gcp_billing_account()
+        if not billing_account:
+            raise ValueError("No billing account detected, Bigbang won't be successful")
+        print(f"GCP Billing Account detected: {billing_account}")
+        return billing_account
+
+    @classmethod
+    def get_steps(cls, cosmos_project: str, bucket_name: str, bucket_region: str, **kwargs):
         """GCP Bigbang. Handle project will be defined and Terraform will be saved in the given bucket
 
         Args:
@@ -47,18 +76,22 @@ class GcpSingularity:
             bucket_name: state file of the cosmos to be saved in this bucket
             bucket_region: bucket should be located in this region
 
+        Returns:
+            Step definition dictionary
         """
-        # Step 1: Get billing account
-        billing_account = CliGCloud.get_gcp_billing_account()
-        if not billing_account:
-            raise ValueError("No billing account detected, Bigbang won't be successful")
-        print(f"GCP Billing Account detected: {billing_account}")
-        # Step 2: Create project
-        CliGCloud.create_gcp_project(cosmos_project)
-        # Step 3: Link project to billing account
-        CliGCloud.link_gcp_billing_project(cosmos_project, billing_account)
-        # Step 4: Activate API services
-        for service in ["cloudresourcemanager", "iam", "cloudbilling", "storage"]:
-            CliGCloud.activate_gcp_service(cosmos_project, service)
-        # Step 5: Create Bucket for saving terraform state files
-        CliGCloud.create_gcs_bucket(cosmos_project, bucket_name, bucket_region)
+        return {
+            "billing": {"run": lambda results: cls.get_billing_account(results, cosmos_project)},
+            "project": {"run": lambda results: CliGCloud.create_gcp_project(cosmos_project)},
+            "billing_link": {
+                "run": lambda results: CliGCloud.link_gcp_billing_project(cosmos_project, results["billing"]),
+                "depends_on": ["billing", "project"]
+            },
+            "services": {
+                "run": lambda results: CliGCloud.activate_gcp_services(cosmos_project, cls.SERVICES),
+                "depends_on": ["billing_link"]
+            },
+            "bucket": {
+                "run": lambda results: CliGCloud.create_gcs_bucket(cosmos_project, bucket_name, bucket_region),
+                "depends_on": ["services"]
+            },
+        }
@@ -1,2 +1,5 @@
+from xia_framework.tools.cli import Cli
 from xia_framework.tools.gcloud import CliGCloud
-from xia_framework.tools.gh import CliGH
\ No newline at end of file
+from xia_framework.tools.gh import CliGH
+from xia_framework.tools.tflock import TfLock, GcsTfLock, LocalTfLock
+from xia_framework.tools.tfcache import TfPluginCache
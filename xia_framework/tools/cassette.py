@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+
+
+class Cassette:
+    """Recorded results of external commands
+
+    The cassette file is a json document: {"records": [{"cmd": ..., "cwd": ..., "stdout": ..., "stderr": ...,
+    "returncode": ..., "duration": ...}, ...]}. Records are keyed by the command line, with the python interpreter
+    replaced by "python", and by the working directory relative to the current one, so a cassette could be replayed
+    on another machine. When replayed, identical keys get their records in the recorded order, the last record is
+    reused once they are exhausted.
+    """
+    def __init__(self, cassette_file: str):
+        self.cassette_file = os.path.abspath(cassette_file)
+        self._lock = threading.Lock()
+        self._replay_queues = None  # command line => records not replayed yet
+
+    @classmethod
+    def _to_text(cls, output):
+        if isinstance(output, bytes):
+            return output.decode("utf-8", errors="replace")
+        return output
+
+    @classmethod
+    def _is_text(cls, kwargs: dict) -> bool:
+        return bool(kwargs.get("text") or kwargs.get("universal_newlines") or kwargs.get("encoding"))
+
+    @classmethod
+    def _get_key(cls, cmd_line: str, cwd=None) -> tuple:
+        """Record key: command line without the interpreter path and working directory relative to the current one"""
+        if sys.executable:
+            cmd_line = cmd_line.replace(sys.executable, "python")
+        return cmd_line, os.path.relpath(cwd) if cwd else "."
+
+    def load_records(self) -> list:
+        if not os.path.exists(self.cassette_file):
+            return []
+        with open(self.cassette_file) as file:
+            return json.load(file).get("records", [])
+
+    def record(self, cmd, cmd_line: str, **kwargs) -> subprocess.CompletedProcess:
+        """Run a command and append its result to the cassette
+
+        Several processes could record into the same cassette, the file is locked during the update
+        """
+        check = kwargs.pop("check", False)
+        start_time = time.perf_counter()
+        r = subprocess.run(cmd, **kwargs)
+        record_cmd, record_cwd = self._get_key(cmd_line, kwargs.get("cwd"))
+        record = {"cmd": record_cmd, "cwd": record_cwd, "stdout": self._to_text(r.stdout),
+                  "stderr": self._to_text(r.stderr), "returncode": r.returncode,
+                  "duration": round(time.perf_counter() - start_time, 6)}
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None  # Not available on Windows
+        os.makedirs(os.path.dirname(self.cassette_file), exist_ok=True)
+        with self._lock, open(self.cassette_file + ".lock", "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                records = self.load_records() + [record]
+                with open(self.cassette_file, "w") as file:
+                    json.dump({"records": records}, file, indent=2)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        if check:
+            r.check_returncode()
+        return r
+
+    def replay(self, cmd, cmd_line: str, latency=None, **kwargs) -> subprocess.CompletedProcess:
+        """Return the recorded result of a command without running it
+
+        Args:
+            cmd: command as given to subprocess.run
+            cmd_line (str): command line used as record key
+            latency: None for no delay, "recorded" to wait the recorded duration or a number of seconds to wait
+            **kwargs: subprocess.run parameters
+
+        Returns:
+            subprocess.CompletedProcess
+        """
+        with self._lock:
+            if self._replay_queues is None:
+                self._replay_queues = {}
+                for record in self.load_records():
+                    self._replay_queues.setdefault((record["cmd"], record.get("cwd", ".")), []).append(record)
+            record_key = self._get_key(cmd_line, kwargs.get("cwd"))
+            queue = self._replay_queues.get(record_key)
+            if not queue:
+                raise ValueError(f"Command not found in cassette {self.cassette_file}: {record_key[0]} "
+                                 f"(in {record_key[1]})")
+            record = queue.pop(0) if len(queue) > 1 else queue[0]
+        if latency == "recorded":
+            time.sleep(record["duration"])
+        elif latency:
+            time.sleep(float(latency))
+        stdout, stderr = record["stdout"], record["stderr"]
+        if not self._is_text(kwargs):
+            stdout = stdout.encode() if stdout is not None else None
+            stderr = stderr.encode() if stderr is not None else None
+        r = subprocess.CompletedProcess(cmd, record["returncode"], stdout=stdout, stderr=stderr)
+        if kwargs.get("check", False):
+            r.check_returncode()
+        return r
@@ -0,0 +1,85 @@
+import os
+import subprocess
+from xia_framework.tracing import tracer
+
+
+class Cli:
+    """Common entry of external command lines
+
+    Commands are run by one of the following backends:
+        * real: commands are executed
+        * record: commands are executed, results are saved in a cassette file
+        * replay: results are read from a cassette file, nothing is executed
+
+    Backend is configured by configure() or by the environment variables XIA_RECORD / XIA_REPLAY (cassette file)
+    and XIA_REPLAY_LATENCY ("recorded" or seconds), which are also inherited by child processes.
+    """
+    ENV_RECORD = "XIA_RECORD"
+    ENV_REPLAY = "XIA_REPLAY"
+    ENV_REPLAY_LATENCY = "XIA_REPLAY_LATENCY"
+    _backend = None  # (mode, cassette, replay latency), loaded from environment variables at first use
+
+    @classmethod
+    def configure(cls, mode: str = "real", cassette_file: str = None, replay_latency=None):
+        """Configure command backend of the current process and its child processes
+
+        Args:
+            mode (str): "real", "record" or "replay"
+            cassette_file (str): Cassette file path, needed by record and replay modes
+            replay_latency: None for no delay, "recorded" to wait the recorded duration or a number of seconds
+        """
+        from xia_framework.tools.cassette import Cassette
+        if mode not in ("real", "record", "replay"):
+            raise ValueError(f"Unknown command backend mode {mode}")
+        if mode != "real" and not cassette_file:
+            raise ValueError(f"Cassette file is needed by {mode} mode")
+        cls.reset()
+        cassette = Cassette(cassette_file) if mode != "real" else None
+        if mode == "record":
+            os.environ[cls.ENV_RECORD] = cassette.cassette_file
+        elif mode == "replay":
+            os.environ[cls.ENV_REPLAY] = cassette.cassette_file
+            if replay_latency:
+                os.environ[cls.ENV_REPLAY_LATENCY] = str(replay_latency)
+        Cli._backend = (mode, cassette, replay_latency)
+
+    @classmethod
+    def reset(cls):
+        """Back to the real backend, dropping the configuration exported to the environment variables"""
+        for env_name in (cls.ENV_RECORD, cls.ENV_REPLAY, cls.ENV_REPLAY_LATENCY):
+            os.environ.pop(env_name, None)
+        Cli._backend = None
+
+    @classmethod
+    def get_backend(cls) -> tuple:
+        if Cli._backend is None:
+            if os.environ.get(cls.ENV_REPLAY):
+                cls.configure("replay", os.environ[cls.ENV_REPLAY], os.environ.get(cls.ENV_REPLAY_LATENCY))
+            elif os.environ.get(cls.ENV_RECORD):
+                cls.configure("record", os.environ[cls.ENV_RECORD])
+            else:
+                Cli._backend = ("real", None, None)
+        return Cli._backend
+
+    @classmethod
+    def run(cls, cmd, **kwargs):
+        """Run an external command, with the same parameters as subprocess.run
+
+        Args:
+            cmd: command string (shell=True) or argument list
+            **kwargs: subprocess.run parameters
+
+        Returns:
+            subprocess.CompletedProcess
+        """
+        cmd_line = cmd if isinstance(cmd, str) else " ".join(cmd)
+        words = cmd_line.split()
+        sub_command = next((word for word in words[1:] if not word.startswith("-")), "")
+        span_name = f"{words[0]} {sub_command}".strip() if words else ""
+        mode, cassette, replay_latency = cls.get_backend()
+        with tracer.span(span_name, category="subprocess", cmd=cmd_line, mode=mode):
+            if mode == "replay":
+                return cassette.replay(cmd, cmd_line, latency=replay_latency, **kwargs)
+            elif mode == "record":
+                return cassette.record(cmd, cmd_line, **kwargs)
+            return subprocess.run(cmd, **kwargs)
@@ -1,62 +1,134 @@
+import os
 import subprocess
+from xia_framework.tools.cli import Cli
+from xia_framework.tools.rescache import ResourceCache
 
 
-class CliGCloud:
+class CliGCloud(Cli):
+    # Existing resources are remembered so that reruns don't need any API call. XIA_RESOURCE_CACHE_TTL=0 disables it
+    resource_cache = ResourceCache(os.path.sep.join([".xia", "cache"]),
+                                   ttl=float(os.environ.get("XIA_RESOURCE_CACHE_TTL", "3600")))
+
     @classmethod
     def get_gcp_billing_account(cls):
         get_billing_cmd = f"gcloud billing accounts list --filter='open=true' --format='value(ACCOUNT_ID)' --limit=1"
-        r = subprocess.run(get_billing_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+        r = cls.run(get_billing_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
         billing_account = r.stdout.strip() if "ERROR" not in r.stderr else None
         return billing_account
 
+    @classmethod
+    def gcp_project_exists(cls, project_name: str) -> bool:
+        if cls.resource_cache.exists("projects", project_name):
+            return True
+        check_project_cmd = f"gcloud projects describe {project_name} --format='value(projectId)'"
+        r = cls.run(check_project_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+        if r.returncode == 0 and project_name in r.stdout:
+            cls.resource_cache.add("projects", project_name)
+            return True
+        return False
+
     @classmethod
     def create_gcp_project(cls, project_name: str, exists_ok: bool = True):
-        check_project_cmd = f"gcloud projects list --filter='{project_name}' --format='value(projectId)'"
-        r = subprocess.run(check_project_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
-        if project_name in r.stdout:
+        if cls.gcp_project_exists(project_name):
             if exists_ok:
                 print(f"Project {project_name} already exists, skip")
             else:
                 raise ValueError(f"Project {project_name} already exists")
         else:
             create_proj_cmd = f"gcloud projects create {project_name} --name='{project_name}'"
-            r = subprocess.run(create_proj_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+            r = cls.run(create_proj_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
             if "ERROR" not in r.stderr:
                 print(f"Project {project_name} created successfully")
+                cls.resource_cache.add("projects", project_name)
             else:
                 raise Exception(r.stderr)
 
     @classmethod
-    def link_gcp_billing_project(cls, project_name: str, billing_account: str):
+    def gcp_billing_linked(cls, project_name: str) -> bool:
+        """Check if the project is known to be linked to a billing account, without any API call"""
+        return cls.resource_cache.exists("billing_links", project_name)
+
+    @classmethod
+    def link_gcp_billing_project(cls, project_name: str, billing_account: str = None):
+        if cls.gcp_billing_linked(project_name):
+            return
         check_billing_cmd = f"gcloud billing projects describe {project_name} --format='value(billingEnabled)'"
-        r = subprocess.run(check_billing_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+        r = cls.run(check_billing_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
         if "true" not in str(r.stdout).lower():
+            if not billing_account:
+                raise ValueError(f"Billing Account is needed to be linked in Cosmos Project {project_name}")
             link_billing_cmd = f"gcloud billing projects link {project_name} --billing-account={billing_account}"
-            r = subprocess.run(link_billing_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+            r = cls.run(link_billing_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
             if "ERROR" not in r.stderr:
                 print(f"Billing Account {billing_account} linked successfully in Cosmos Project {project_name}")
             else:
                 raise Exception(r.stderr)
+        cls.resource_cache.add("billing_links", project_name)
+
+    @classmethod
+    def gcs_bucket_exists(cls, bucket_name: str) -> bool:
+        if cls.resource_cache.exists("buckets", bucket_name):
+            return True
+        check_bucket_cmd = f"gcloud storage buckets describe gs://{bucket_name} --format='value(name)'"
+        r = cls.run(check_bucket_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+        if r.returncode == 0:
+            cls.resource_cache.add("buckets", bucket_name)
+            return True
+        return False
 
     @classmethod
     def create_gcs_bucket(cls, project_name: str, bucket_name: str, bucket_region: str):
+        if cls.gcs_bucket_exists(bucket_name):
+            print(f"Cosmos Bucket {bucket_name} already exists, skip")
+            return
         create_bucket_cmd = (f"gcloud storage buckets create gs://{bucket_name} "
                              f"--uniform-bucket-level-access "
                              f"--location {bucket_region} "
                              f"--project {project_name} ")
-        r = subprocess.run(create_bucket_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+        r = cls.run(create_bucket_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
         if "ERROR" not in r.stderr:
             print(f"Cosmos Bucket {bucket_name} created successfully in {bucket_region}")
         elif "you already own it" in r.stderr:
             print(f"Cosmos Bucket {bucket_name} already exists, skip")
         else:
             raise Exception(r.stderr)
+        cls.resource_cache.add("buckets", bucket_name)
 
     @classmethod
     def activate_gcp_service(cls, project_name: str, service_name: str):
-        enable_api_cmd = f"gcloud services enable {service_name}.googleapis.com --project {project_name}"
-        r = subprocess.run(enable_api_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+        cls.activate_gcp_services(project_name, [service_name])
+
+    @classmethod
+    def get_enabled_gcp_services(cls, project_name: str) -> list:
+        list_service_cmd = f"gcloud services list --enabled --project {project_name} --format='value(config.name)'"
+        r = cls.run(list_service_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+        if r.returncode != 0:
+            return []
+        return [line.strip() for line in r.stdout.splitlines() if line.strip()]
+
+    @classmethod
+    def activate_gcp_services(cls, project_name: str, service_names: list):
+        """Enable several API services with a single call, services already enabled are skipped
+
+        Args:
+            project_name: GCP project name
+            service_names: service names without the ".googleapis.com" suffix
+        """
+        service_names = [service_name for service_name in service_names
+                         if not cls.resource_cache.exists("services", f"{project_name}/{service_name}")]
+        if not service_names:
+            return
+        enabled_services = [service.split(".googleapis.com")[0]
+                            for service in cls.get_enabled_gcp_services(project_name)]
+        cls.resource_cache.add("services", *[f"{project_name}/{service_name}" for service_name in enabled_services])
+        service_names = [service_name for service_name in service_names if service_name not in enabled_services]
+        if not service_names:
+            return
+        service_list = " ".join(f"{service_name}.googleapis.com" for service_name in service_names)
+        enable_api_cmd = f"gcloud services enable {service_list} --project {project_name}"
+        r = cls.run(enable_api_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
         if "ERROR" not in r.stderr:
-            print(f"Service {service_name} enabled successfully in Cosmos Project {project_name}")
+            print(f"Services {', '.join(service_names)} enabled successfully in Cosmos Project {project_name}")
+            cls.resource_cache.add("services", *[f"{project_name}/{service_name}" for service_name in service_names])
         else:
-            raise Exception(r.stderr)
\ No newline at end of file
+            raise Exception(r.stderr)
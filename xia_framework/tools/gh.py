@@ -1,44 +1,77 @@
 import json
 import subprocess
+from xia_framework.tools.cli import Cli
 
 
-class CliGH:
+class CliGH(Cli):
+    _variable_cache = {}  # Environment name (None for repository level) => variable dictionary
+    _repo_cache = {}
+
     @classmethod
-    def get_gh_variable_dict(cls) -> dict:
-        get_var_dict_cmd = f"gh variable list --json=name,value"
-        r = subprocess.run(get_var_dict_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
-        var_record = json.loads(r.stdout.strip())
-        var_dict = {line["name"].lower(): line["value"] for line in var_record}
-        return var_dict
+    def get_gh_variable_dict(cls, env_name: str = None, refresh: bool = False) -> dict:
+        """Get all variables of the current repository with a single call, results are cached for the whole run
+
+        Args:
+            env_name (str): Environment name to get environment level variables, repository level if not provided
+            refresh (bool): Ignore the cached values
+
+        Returns:
+            variable dictionary with lowered variable names as key
+        """
+        if refresh or env_name not in cls._variable_cache:
+            get_var_dict_cmd = f"gh variable list --json=name,value"
+            if env_name:
+                get_var_dict_cmd += f" -e {env_name}"
+            r = cls.run(get_var_dict_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+            if r.returncode != 0:
+                raise Exception(r.stderr)
+            var_record = json.loads(r.stdout.strip() or "[]")
+            cls._variable_cache[env_name] = {line["name"].lower(): line["value"] for line in var_record}
+        return dict(cls._variable_cache[env_name])
 
     @classmethod
     def get_gh_action_var(cls, variable_name: str, env_name: str = None):
-        get_variable_cmd = f"gh variable get {variable_name}"
-        if env_name:
-            get_variable_cmd += f" -e {env_name}"
-        r = subprocess.run(get_variable_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
-        return r.stdout.strip() if "was not found" not in r.stderr else None
+        return cls.get_gh_variable_dict(env_name).get(variable_name.lower(), None)
 
     @classmethod
     def set_gh_action_var(cls, variable_name: str, variable_value: str, env_name: str = None):
         get_variable_cmd = f'gh variable set {variable_name} --body "{variable_value}"'
         if env_name:
             get_variable_cmd += f" -e {env_name}"
-        r = subprocess.run(get_variable_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+        r = cls.run(get_variable_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
         if "ERROR" not in r.stderr:
             print(f"Variable {variable_name} updated successfully")
+            if env_name in cls._variable_cache:
+                cls._variable_cache[env_name][variable_name.lower()] = str(variable_value)
         else:
             raise Exception(r.stderr)
 
+    @classmethod
+    def _get_gh_repo_view(cls) -> dict:
+        if not cls._repo_cache:
+            get_repo_cmd = "gh repo view --json owner,name"
+            r = cls.run(get_repo_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+            cls._repo_cache.update(json.loads(r.stdout))
+        return cls._repo_cache
+
+    @classmethod
+    def clone_repo(cls, repository_owner: str, repository_name: str, target_dir: str):
+        """Clone a repository into a local directory
+
+        Args:
+            repository_owner (str): Repository owner
+            repository_name (str): Repository name
+            target_dir (str): Local directory
+        """
+        clone_cmd = ["gh", "repo", "clone", f"{repository_owner}/{repository_name}", target_dir]
+        r = cls.run(clone_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if r.returncode != 0:
+            raise Exception(r.stderr)
+
     @classmethod
     def get_gh_owner(cls):
-        get_owner_cmd = "gh repo view --json owner"
-        r = subprocess.run(get_owner_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
-        owner_dict = json.loads(r.stdout)
-        return owner_dict["owner"]["login"]
+        return cls._get_gh_repo_view()["owner"]["login"]
 
     @classmethod
     def get_gh_repo(cls):
-        get_repo_cmd = "gh repo view --json name -q .name"
-        r = subprocess.run(get_repo_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
-        return r.stdout.strip()
+        return cls._get_gh_repo_view()["name"]
@@ -0,0 +1,67 @@
+import os
+import json
+import time
+import tempfile
+import threading
+
+
+class ResourceCache:
+    """Local cache of cloud resources known to exist
+
+    Each resource kind (projects, buckets...) is saved as a json file of resource key => check time. Only existing
+    resources are cached, entries older than the time to live are checked again.
+    """
+    def __init__(self, cache_dir: str, ttl: float = 3600):
+        """
+        Args:
+            cache_dir: cache directory
+            ttl: time to live of entries in seconds, cache is disabled if 0
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _get_file(self, kind: str) -> str:
+        return os.path.join(self.cache_dir, f"{kind}.json")
+
+    def _load(self, kind: str) -> dict:
+        try:
+            with open(self._get_file(kind)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, kind: str, entries: dict):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", dir=self.cache_dir, suffix=".tmp", delete=False) as temp_file:
+                json.dump(entries, temp_file, indent=2, sort_keys=True)
+            os.replace(temp_file.name, self._get_file(kind))
+        except OSError:
+            pass  # Cache is only an optimization
+
+    def exists(self, kind: str, key: str) -> bool:
+        """Check if a resource is known to exist
+
+        Args:
+            kind (str): Resource kind
+            key (str): Resource key
+
+        Returns:
+            True if the resource has been seen less than ttl seconds ago
+        """
+        if not self.ttl:
+            return False
+        with self._lock:
+            check_time = self._load(kind).get(key, None)
+        return check_time is not None and time.time() - check_time < self.ttl
+
+    def add(self, kind: str, *keys: str):
+        """Remember resources as existing"""
+        if not self.ttl or not keys:
+            return
+        with self._lock:
+            entries = self._load(kind)
+            now = time.time()
+            entries.update({key: now for key in keys})
+            self._save(kind, entries)
@@ -0,0 +1,136 @@
+import os
+import shutil
+import contextlib
+
+
+class TfPluginCache:
+    """Terraform provider plugin cache shared by all environments and layers
+
+    Terraform saves each provider as <host>/<namespace>/<type>/<version>/<platform> in the cache directory,
+    so the same provider build is only downloaded once.
+    """
+    ENTRY_DEPTH = 5  # host / namespace / type / version / platform
+
+    @classmethod
+    def get_env(cls, cache_dir: str) -> dict:
+        """Get environment variables of terraform subprocess
+
+        Args:
+            cache_dir: plugin cache directory
+
+        Returns:
+            Copy of current environment variables with TF_PLUGIN_CACHE_DIR defined
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        return dict(os.environ, TF_PLUGIN_CACHE_DIR=os.path.abspath(cache_dir))
+
+    @classmethod
+    @contextlib.contextmanager
+    def lock(cls, cache_dir: str):
+        """Terraform doesn't support concurrent installation into the same cache, this lock serializes them"""
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None  # Not available on Windows
+        with open(os.path.join(cache_dir, ".lock"), "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @classmethod
+    def get_entries(cls, cache_dir: str) -> list:
+        """Get all provider builds of the cache
+
+        Returns:
+            List of (last used time, size in bytes, path)
+        """
+        entries = []
+        base_depth = os.path.abspath(cache_dir).rstrip(os.path.sep).count(os.path.sep)
+        for root, dirs, files in os.walk(os.path.abspath(cache_dir)):
+            if root.count(os.path.sep) - base_depth < cls.ENTRY_DEPTH:
+                continue
+            dirs[:] = []
+            size = sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in os.walk(root) for f in fs)
+            entries.append((os.stat(root).st_mtime, size, root))
+        return entries
+
+    @classmethod
+    def get_used_paths(cls, work_dirs: list, cache_dir: str) -> set:
+        """Get provider builds of the cache linked from terraform working directories
+
+        Args:
+            work_dirs: terraform working directories
+            cache_dir: plugin cache directory
+
+        Returns:
+            set of provider build paths, in the same format as get_entries
+        """
+        cache_dir = os.path.realpath(cache_dir)
+        used_paths = set()
+        for work_dir in work_dirs:
+            for root, dirs, files in os.walk(os.path.join(work_dir, ".terraform", "providers")):
+                for name in dirs + files:
+                    real_path = os.path.realpath(os.path.join(root, name))
+                    if real_path.startswith(cache_dir + os.path.sep):
+                        relative_parts = os.path.relpath(real_path, cache_dir).split(os.path.sep)
+                        if len(relative_parts) >= cls.ENTRY_DEPTH:
+                            used_paths.add(os.path.join(cache_dir, *relative_parts[:cls.ENTRY_DEPTH]))
+        return used_paths
+
+    @classmethod
+    def is_resolved(cls, work_dir: str) -> bool:
+        """Check that all provider links of a terraform working directory point to existing files"""
+        for root, dirs, files in os.walk(os.path.join(work_dir, ".terraform", "providers")):
+            for name in dirs + files:
+                link_path = os.path.join(root, name)
+                if os.path.islink(link_path) and not os.path.exists(link_path):
+                    return False
+        return True
+
+    @classmethod
+    def touch_used(cls, work_dir: str, cache_dir: str):
+        """Mark provider builds used by a terraform working directory as recently used
+
+        Args:
+            work_dir: terraform working directory
+            cache_dir: plugin cache directory
+        """
+        for used_path in cls.get_used_paths([work_dir], cache_dir):
+            if os.path.isdir(used_path):
+                os.utime(used_path)
+
+    @classmethod
+    def prune(cls, cache_dir: str, max_size_mb: int, keep_paths: set = None) -> list:
+        """Remove least recently used provider builds until the cache fits in the given size
+
+        Args:
+            cache_dir: plugin cache directory
+            max_size_mb: maximum size in MB
+            keep_paths: provider builds which must not be removed (still linked from working directories)
+
+        Returns:
+            List of removed paths
+        """
+        entries = sorted(cls.get_entries(cache_dir))
+        total_size, max_size = sum(entry[1] for entry in entries), max_size_mb * 1024 * 1024
+        keep_paths = {os.path.realpath(path) for path in keep_paths or []}
+        removed = []
+        for last_used, size, path in entries:
+            if total_size <= max_size:
+                break
+            if os.path.realpath(path) in keep_paths:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+            removed.append(path)
+            # Clean up empty parent directories
+            parent = os.path.dirname(path)
+            while parent != os.path.abspath(cache_dir) and not os.listdir(parent):
+                os.rmdir(parent)
+                parent = os.path.dirname(parent)
+        return removed
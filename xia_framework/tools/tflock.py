@@ -0,0 +1,95 @@
+import os
+import re
+import json
+import subprocess
+from xia_framework.tools.cli import Cli
+from datetime import datetime, timezone
+
+
+class TfLock:
+    """Inspection of terraform state lock objects directly from the backend storage"""
+    @classmethod
+    def get_lock_path(cls, prefix: str, workspace: str = "default") -> str:
+        return f"{prefix.rstrip('/')}/{workspace}.tflock"
+
+    @classmethod
+    def read_lock(cls, bucket_name: str, lock_path: str):
+        """Read the raw content of lock object
+
+        Args:
+            bucket_name: bucket holding the terraform state
+            lock_path: path of the lock object inside the bucket
+
+        Returns:
+            Content of lock object, None if there is no lock
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def _parse_time(cls, time_str: str):
+        # Terraform uses RFC 3339 with nanoseconds, python could only handle microseconds
+        time_str = time_str.replace("Z", "+00:00")
+        match = re.match(r"^(.*\.)(\d+)(.*)$", time_str)
+        if match:
+            time_str = f"{match.group(1)}{match.group(2)[:6].ljust(6, '0')}{match.group(3)}"
+        return datetime.fromisoformat(time_str)
+
+    @classmethod
+    def get_lock_info(cls, bucket_name: str, prefix: str, workspace: str = "default"):
+        """Get lock information of a terraform state
+
+        Args:
+            bucket_name: bucket holding the terraform state
+            prefix: state prefix
+            workspace: terraform workspace
+
+        Returns:
+            dictionary with id, holder, operation, created and age (in seconds), None if there is no lock
+        """
+        lock_content = cls.read_lock(bucket_name, cls.get_lock_path(prefix, workspace))
+        if not lock_content:
+            return None
+        lock_dict = json.loads(lock_content)
+        created = cls._parse_time(lock_dict["Created"]) if lock_dict.get("Created") else None
+        return {
+            "id": lock_dict["ID"],
+            "holder": lock_dict.get("Who"),
+            "operation": lock_dict.get("Operation"),
+            "created": created,
+            "age": (datetime.now(timezone.utc) - created).total_seconds() if created else None,
+        }
+
+
+class GcsTfLock(TfLock):
+    """Lock object of Google Cloud Storage backend. google-cloud-storage is used when installed, gcloud otherwise"""
+    @classmethod
+    def read_lock(cls, bucket_name: str, lock_path: str):
+        try:
+            from google.cloud import storage
+            from google.api_core.exceptions import NotFound
+        except ImportError:
+            storage = None
+        if storage is not None:
+            try:
+                return storage.Client().bucket(bucket_name).blob(lock_path).download_as_text()
+            except NotFound:
+                return None
+        read_lock_cmd = f"gcloud storage cat gs://{bucket_name}/{lock_path}"
+        r = Cli.run(read_lock_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
+        if r.returncode == 0:
+            return r.stdout
+        elif "matched no objects" in r.stderr or "No URLs matched" in r.stderr or "NotFound" in r.stderr:
+            return None
+        else:
+            raise Exception(r.stderr)
+
+
+class LocalTfLock(TfLock):
+    """Lock object saved in a local directory, bucket name is the directory path"""
+    @classmethod
+    def read_lock(cls, bucket_name: str, lock_path: str):
+        file_path = os.path.join(bucket_name, lock_path)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path) as lock_file:
+            return lock_file.read()
@@ -0,0 +1,98 @@
+import os
+import json
+import time
+import threading
+import functools
+import contextlib
+
+
+class Tracer:
+    """Span recorder of framework phases and subprocesses
+
+    Spans could be displayed as a summary table or exported as Chrome trace events (chrome://tracing, Perfetto)
+    """
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "phase", **kwargs):
+        """Record the duration of a code block
+
+        Args:
+            name (str): Span name
+            category (str): Span category, like "phase", "module" or "subprocess"
+            **kwargs: Extra information to be displayed in trace viewer
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            end_time = time.perf_counter()
+            with self._lock:
+                self.spans.append({
+                    "name": name, "cat": category, "args": kwargs, "tid": threading.get_ident(),
+                    "start": start_time - self._origin, "duration": end_time - start_time,
+                })
+
+    def traced(self, name: str = None, category: str = "phase"):
+        """Decorator recording a span of each function call
+
+        Args:
+            name (str): Span name, default to function name
+            category (str): Span category
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name if name else func.__name__, category=category):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+            self._origin = time.perf_counter()
+
+    def get_summary(self) -> list:
+        """Aggregate spans by category and name
+
+        Returns:
+            list of dictionaries with category, name, count, total and max duration, longest total first
+        """
+        summary = {}
+        for span in self.spans:
+            line = summary.setdefault((span["cat"], span["name"]),
+                                      {"category": span["cat"], "name": span["name"], "count": 0, "total": 0.0,
+                                       "max": 0.0})
+            line["count"] += 1
+            line["total"] += span["duration"]
+            line["max"] = max(line["max"], span["duration"])
+        return sorted(summary.values(), key=lambda x: x["total"], reverse=True)
+
+    def print_summary(self):
+        summary = self.get_summary()
+        name_width = max([len(line["name"]) for line in summary] + [4])
+        print(f"{'Category':<12} {'Name':<{name_width}} {'Count':>6} {'Total(s)':>10} {'Max(s)':>10}")
+        for line in summary:
+            print(f"{line['category']:<12} {line['name']:<{name_width}} {line['count']:>6} "
+                  f"{line['total']:>10.3f} {line['max']:>10.3f}")
+
+    def write_chrome_trace(self, file_path: str):
+        """Write spans as Chrome trace event file
+
+        Args:
+            file_path (str): Output file path
+        """
+        trace_events = [{
+            "name": span["name"], "cat": span["cat"], "ph": "X", "pid": os.getpid(), "tid": span["tid"],
+            "ts": round(span["start"] * 1e6, 3), "dur": round(span["duration"] * 1e6, 3),
+            "args": {k: str(v) for k, v in span["args"].items()},
+        } for span in self.spans]
+        with open(file_path, "w") as trace_file:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, trace_file)
+
+
+tracer = Tracer()  # Tracer of the current process